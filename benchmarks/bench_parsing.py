@@ -0,0 +1,57 @@
+"""Parse time per page on the synthetic HTML fixtures.
+
+The fixtures are hand-written pages with the structure the parsers read, padded with filler
+scripts, not saved Letterboxd or Allocine pages: speedups measured on them are indicative only,
+real pages should be saved (and sanitized) into fixtures/ to get actual figures.
+
+Compares the full-document html.parser baseline with the parsing module
+(SoupStrainer-limited, with lxml when installed).
+
+    python benchmarks/bench_parsing.py [--repeat 50]
+"""
+### --- Imports ---
+import argparse
+import os
+import sys
+import timeit
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import parsing
+
+
+### --- Parameters ---
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = {
+    "watchlist page": ("letterboxd_watchlist_page.html", parsing.parse_watchlist_slugs, parsing.STRAINER_WATCHLIST),
+    "film page": ("letterboxd_film.html", parsing.parse_film_details, parsing.STRAINER_FILM_DETAILS),
+    "catalogue page": ("allocine_films_page.html", parsing.parse_films_page, parsing.STRAINER_CATALOGUE),
+}
+
+
+### --- Functions ---
+def time_per_page(func, repeat: int) -> float:
+    """Best of 3 mean time of func, in milliseconds
+
+    """
+    return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat * 1000
+
+def run(repeat: int):
+    parsers = ["html.parser"] + (["lxml"] if parsing.HTML_PARSER == "lxml" else [])
+    print(f"{'page':<16}{'parser':<13}{'full (ms)':>11}{'strained (ms)':>15}{'speedup':>9}")
+    for page, (filename, parse, strainer) in PAGES.items():
+        with open(os.path.join(FIXTURES_PATH, filename), "rb") as f:
+            markup = f.read()
+        for parser in parsers:
+            full = time_per_page(lambda: BeautifulSoup(markup, parser), repeat)
+            strained = time_per_page(lambda: BeautifulSoup(markup, parser, parse_only=strainer), repeat)
+            print(f"{page:<16}{parser:<13}{full:>11.2f}{strained:>15.2f}{full / strained:>8.1f}x")
+        baseline = time_per_page(lambda: BeautifulSoup(markup, "html.parser"), repeat)
+        parsed = time_per_page(lambda: parse(markup), repeat)
+        print(f"{page:<16}{'parsing.py':<13}{baseline:>11.2f}{parsed:>15.2f}{baseline / parsed:>8.1f}x  (with extraction)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    run(parser.parse_args().repeat)
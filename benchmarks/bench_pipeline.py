@@ -0,0 +1,171 @@
+"""Whole pipeline benchmark, offline, against the local stand-in server (standin.py).
+
+Runs the real scripts on a synthetic scale, in a temporary working directory: scraping_all_films.py
+crawls the catalogue, then main.py's run() processes every user (watchlist, film pages, matching,
+showtimes, exports, rendering, emails written to a sink directory).
+Reports throughput, peak memory and per-stage times (of the last run), with the title index
+build (build_index) and the title matching calls of all runs (find_closest_id) timed on their own.
+Results can be saved and compared with a saved baseline.
+
+    python benchmarks/bench_pipeline.py [--users 4] [--watchlist 100] [--catalogue 20000]
+        [--theaters 50] [--runs 1] [--memory]
+        [--save results.json] [--baseline baseline.json]
+
+With --runs, main.run() is called again on the warm process, as the service does.
+"""
+### --- Imports ---
+import argparse
+import json
+import os
+import resource
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_PATH)
+import utils
+from metrics import RunMetrics
+
+from standin import SyntheticWorld, serve
+
+
+### --- Functions ---
+def point_at_standin(base_url: str, rate: float):
+    """Points the scripts' URLs and rate limits at the stand-in server, before they are imported.
+       parsing is imported first: film urls (and the ids read from them) keep Allocine's host.
+    """
+    import parsing
+    utils.URL_LETTERBOXD = base_url
+    utils.URL_ALLOCINE = base_url
+    utils.URL_ALLOCINE_SHOWTIMES = base_url + "_/showtimes/"
+    utils.RATE_LIMITS = {"127.0.0.1": rate}
+
+def write_inputs(world: SyntheticWorld):
+    """Input files of main.py for the synthetic users, all in one city
+
+    """
+    for path in [utils.WATCHLIST_PATH, utils.PROGRAMME_PATH, os.path.dirname(utils.USERS_INFO_PATH)]:
+        os.makedirs(path, exist_ok=True)
+    utils.dump_json({"Paris": "C0001"}, utils.ALLOCINE_CITIES_PATH)
+    utils.dump_json([
+        {"lb_profile_id": user_name, "email_address": f"{user_name}@example.com",
+         "city": "Paris", "departments_subset": ["75", "92", "93", "94"]}
+        for user_name in world.users
+    ], utils.USERS_INFO_PATH)
+
+def instrument(main, letterboxd, showtimes):
+    """Times parsing and grouping where the pipeline calls them, in the metrics of the current run
+
+    """
+    def timed(name: str, func):
+        return lambda *args, **kwargs: main.metrics.timed(name, func)(*args, **kwargs)
+
+    for name in ["parse_watchlist_nb_pages", "parse_watchlist_slugs", "parse_film_details"]:
+        setattr(letterboxd, name, timed("parsing", getattr(letterboxd, name)))
+    showtimes.group_showtimes_by_day = timed("grouping", showtimes.group_showtimes_by_day)
+
+def run(args) -> dict:
+    world = SyntheticWorld(args.users, args.watchlist, args.catalogue, args.theaters, nb_days=31,
+                           date_start=date.today().isoformat())
+    server, base_url = serve(world)
+    point_at_standin(base_url, args.rate)
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+    write_inputs(world)
+    os.environ["EMAIL_SINK_DIR"] = os.path.join(workdir.name, "sink")
+    if args.memory:
+        tracemalloc.start()
+    start = time.monotonic()
+
+    # Title index build and title matching, timed on their own over the crawl and all runs
+    import catalogue
+    import mapping
+    index_metrics = RunMetrics("bench_pipeline")
+    catalogue.write_title_index = index_metrics.timed("build_index", catalogue.write_title_index)
+    mapping.find_closest_match = index_metrics.timed("find_closest_id", mapping.find_closest_match)
+
+    # Catalogue crawl
+    sys.argv = ["scraping_all_films.py"]
+    crawl = runpy.run_path(os.path.join(SRC_PATH, "scraping_all_films.py"))
+    crawl_report = crawl["metrics"].report()
+
+    # Users, one or more runs of the warm process
+    import main
+    import letterboxd
+    import showtimes
+    instrument(main, letterboxd, showtimes)
+    runs_seconds = []
+    for _ in range(args.runs):
+        run_start = time.monotonic()
+        main.run(main.load_users())
+        runs_seconds.append(time.monotonic() - run_start)
+    nb_films = sum(len(utils.load_json(utils.WATCHLIST_PATH + user_name + utils.WATCHLIST_FILENAME, default={}))
+                   for user_name in world.users)
+
+    report = main.metrics.report()
+    crawl_requests = sum(host["requests"] for host in crawl_report["hosts"].values())
+    results = {
+        "scale": {key: getattr(args, key) for key in ["users", "watchlist", "catalogue", "theaters", "runs"]},
+        "wall_seconds": time.monotonic() - start,
+        "throughput": {
+            "catalogue_pages_per_s": crawl_requests / crawl_report["wall_seconds"],
+            "catalogue_films_per_s": crawl_report["counters"]["catalogue"]["films"] / crawl_report["wall_seconds"],
+            "watchlist_films_per_s": nb_films / runs_seconds[-1],
+            "requests_per_s": sum(host["requests"] for host in report["hosts"].values()) / report["wall_seconds"],
+        },
+        "stages_seconds": {
+            **{f"catalogue_{name}": stats["seconds"] for name, stats in crawl_report["stages"].items()},
+            **{name: stats["seconds"] for name, stats in index_metrics.report()["stages"].items()},
+            **{name: stats["seconds"] for name, stats in report["stages"].items()},
+        },
+        "runs_seconds": {f"run_{i + 1}": seconds for i, seconds in enumerate(runs_seconds)},
+        "memory_mb": {"max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024},
+    }
+    if args.memory:
+        results["memory_mb"]["traced_peak"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    server.shutdown()
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+    return results
+
+def print_results(results: dict, baseline: dict = None):
+    print(", ".join(f"{key}={value}" for key, value in results["scale"].items()))
+    print(f"{'metric':<32}{'value':>12}{'baseline':>12}{'ratio':>8}")
+    for section in ["throughput", "stages_seconds", "runs_seconds", "memory_mb"]:
+        for name, value in results[section].items():
+            reference = (baseline or {}).get(section, {}).get(name)
+            line = f"{section[:6] + ' ' + name:<32}{value:>12.2f}"
+            if reference:
+                line += f"{reference:>12.2f}{value / reference:>7.2f}x"
+            print(line)
+    print(f"{'wall_seconds':<32}{results['wall_seconds']:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--watchlist", type=int, default=100)
+    parser.add_argument("--catalogue", type=int, default=20000)
+    parser.add_argument("--theaters", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=1, help="runs of main.py's pipeline in the same process")
+    parser.add_argument("--rate", type=float, default=10000, help="requests per second per host")
+    parser.add_argument("--memory", action="store_true", help="also trace Python allocations (stage times are then inflated)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --save")
+    args = parser.parse_args()
+
+    save_path = os.path.abspath(args.save) if args.save else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = run(args)
+    print_results(results, baseline)
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,89 @@
+"""Showtimes grouping and department filtering microbenchmark.
+
+Compares the per-showtime strptime/strftime grouping and the any(startswith)
+department filter with showtimes.py, on a synthetic big-city programme.
+
+    python benchmarks/bench_showtimes.py [--theaters 300] [--days 30] [--repeat 5]
+"""
+### --- Imports ---
+import argparse
+import os
+import random
+import sys
+import timeit
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from showtimes import department_matcher, group_showtimes_by_day
+
+
+### --- Functions ---
+def make_programme(nb_theaters: int, nb_days: int) -> list[dict]:
+    """Synthetic film showtimes: nb_theaters theaters, 1 to 6 showtimes a day
+
+    """
+    random.seed(0)
+    start = datetime(2026, 10, 18)
+    programme = []
+    for t in range(nb_theaters):
+        zip_code = random.choice(["75", "92", "93", "94", "77", "78", "91", "95"]) + f"{random.randint(0, 999):03d}"
+        showtimes = [
+            ((start + timedelta(days=d)).strftime("%Y-%m-%d") + f"T{h:02d}:{m:02d}:00", "ORIGINAL")
+            for d in range(nb_days)
+            for h, m in sorted({(random.randint(10, 22), random.choice([0, 15, 30, 45])) for _ in range(random.randint(1, 6))})
+        ]
+        programme.append({
+            "theater_id": f"P{t:04d}",
+            "theater_zip": zip_code,
+            "theater_showtimes": showtimes,
+        })
+    return programme
+
+def group_baseline(film_showtimes: list[dict]) -> dict:
+    """Day grouping as main.py did it before showtimes normalization
+
+    """
+    daily_info = defaultdict(list)
+    for theater in film_showtimes:
+        for showtime in theater['theater_showtimes']:
+            showtime_day_date = datetime.strptime(showtime[0].split('T')[0], '%Y-%m-%d')
+            showtime_day_number = datetime.strftime(showtime_day_date,'%d')
+            showtime_day_name = datetime.strftime(showtime_day_date,'%A')
+            showtime_month_name = datetime.strftime(showtime_day_date,'%B')
+            showtime_year = datetime.strftime(showtime_day_date,'%Y')
+            showtime_date_name = ' '.join([showtime_day_name, showtime_day_number, showtime_month_name, showtime_year])
+            showtime_hour = showtime[0].split('T')[1][:5].replace(':','h')
+            if (showtime_hour >= "18h00") | (showtime_day_name in ['Saturday', 'Sunday']):
+                daily_info[showtime_date_name].append({
+                    'theater_id': theater['theater_id'],
+                    'showtime_hour': showtime_hour,
+                })
+    return dict(daily_info)
+
+def run(nb_theaters: int, nb_days: int, repeat: int):
+    programme = make_programme(nb_theaters, nb_days)
+    nb_showtimes = sum(len(theater["theater_showtimes"]) for theater in programme)
+    assert group_baseline(programme) == group_showtimes_by_day(programme)
+    print(f"{nb_theaters} theaters, {nb_days} days, {nb_showtimes} showtimes")
+
+    baseline = min(timeit.repeat(lambda: group_baseline(programme), number=1, repeat=repeat))
+    grouped = min(timeit.repeat(lambda: group_showtimes_by_day(programme), number=1, repeat=repeat))
+    print(f"{'day grouping':<20}{baseline * 1000:>10.2f} ms{grouped * 1000:>10.2f} ms{baseline / grouped:>8.1f}x")
+
+    departments = ["75", "92", "93", "94"]
+    zip_codes = [theater["theater_zip"] for theater in programme] * nb_days
+    in_departments = department_matcher(departments)
+    assert [any(z.startswith(d) for d in departments) for z in zip_codes] == [in_departments(z) for z in zip_codes]
+    baseline = min(timeit.repeat(lambda: [any(z.startswith(d) for d in departments) for z in zip_codes], number=1, repeat=repeat))
+    filtered = min(timeit.repeat(lambda: [in_departments(z) for z in zip_codes], number=1, repeat=repeat))
+    print(f"{'department filter':<20}{baseline * 1000:>10.2f} ms{filtered * 1000:>10.2f} ms{baseline / filtered:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--theaters", type=int, default=300)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.theaters, args.days, args.repeat)
@@ -0,0 +1,93 @@
+"""Golden-set check of title matching: find_closest_id against the difflib full scan it replaced.
+
+Every Letterboxd film of the golden set is matched both ways; any difference, including a film
+found by one and not by the other, is listed and makes the check fail. The golden set is a
+synthetic world (standin.py: catalogue films under altered titles, and films absent from it),
+or real data: a catalogue JSON and a Letterboxd films cache, as main.py stores them.
+
+    python benchmarks/check_matching.py [--catalogue 5000] [--users 4] [--watchlist 100]
+    python benchmarks/check_matching.py --catalogue-json data/input/allocine_films.json \
+        --films-json data/cache/letterboxd_films.json
+"""
+### --- Imports ---
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from utils import build_index, build_title_index, find_closest_id
+
+from standin import SyntheticWorld
+
+
+### --- Functions ---
+def full_scan_closest_id(target: str, title_to_id_year: dict, year: str = None) -> str | None:
+    """find_closest_id before the title index: difflib over every catalogue title, then year filter
+
+    """
+    possible_years = [str(int(year) + offset) for offset in range(-5, 6)] if year else None
+    matches = difflib.get_close_matches(target, list(title_to_id_year.keys()), n=10, cutoff=0.0)
+    match_year = None
+    if matches:
+        if year:
+            match_year = [elem for match in matches for elem in title_to_id_year[match] if elem['ac_year'] in possible_years]
+        else:
+            match_year = title_to_id_year[matches[0]]
+    return match_year[0]['ac_id'] if match_year else None
+
+def golden_set(args) -> tuple[dict, dict]:
+    """(catalogue, Letterboxd films {slug: {lb_title, lb_year, lb_original_title}}) to check
+
+    """
+    if args.catalogue_json:
+        with open(args.catalogue_json, "r", encoding="utf-8") as f:
+            catalogue = json.load(f)
+        with open(args.films_json, "r", encoding="utf-8") as f:
+            films = json.load(f)
+        return catalogue, films
+    world = SyntheticWorld(args.users, args.watchlist, args.catalogue)
+    return world.catalogue, world.films
+
+def check(catalogue: dict, films: dict) -> int:
+    """Matches films both ways, prints differences and timings, returns the number of differences
+
+    """
+    title_to_id_year = build_index(catalogue)
+    title_index = build_title_index(title_to_id_year)
+    differences = 0
+    not_found = 0
+    seconds = {"full_scan": 0.0, "index": 0.0}
+    for slug, film in films.items():
+        target = film.get("lb_original_title") or film.get("lb_title")
+        year = film.get("lb_year")
+        start = time.perf_counter()
+        expected = full_scan_closest_id(target, title_to_id_year, year)
+        seconds["full_scan"] += time.perf_counter() - start
+        start = time.perf_counter()
+        found = find_closest_id(target, title_index, year)
+        seconds["index"] += time.perf_counter() - start
+        not_found += expected is None
+        if found != expected:
+            differences += 1
+            print(f"[DIFF] {slug} ({target!r}, {year}): full scan {expected}, index {found}")
+    print(f"{len(films)} films, {len(catalogue)} catalogue films: {differences} differences, "
+          f"{not_found} not found by the full scan")
+    print(f"full scan {seconds['full_scan']:.2f}s, index {seconds['index']:.2f}s")
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalogue", type=int, default=5000, help="synthetic catalogue size")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--watchlist", type=int, default=100)
+    parser.add_argument("--catalogue-json", help="real catalogue, e.g. data/input/allocine_films.json")
+    parser.add_argument("--films-json", help="real Letterboxd films, e.g. data/cache/letterboxd_films.json")
+    args = parser.parse_args()
+    if bool(args.catalogue_json) != bool(args.films_json):
+        parser.error("--catalogue-json and --films-json go together")
+
+    sys.exit(1 if check(*golden_set(args)) else 0)
@@ -0,0 +1,254 @@
+"""Local stand-in for Letterboxd and Allocine, serving synthetic pages built from the synthetic fixtures.
+
+A SyntheticWorld holds users' watchlists, an Allocine catalogue and theaters; serve() exposes it
+over HTTP with the routes the scrapers use:
+
+    /{user}/watchlist/, /{user}/watchlist/page/{n}/     Letterboxd watchlist pages
+    /film/{slug}                                        Letterboxd film pages
+    /films/?page={n}                                    Allocine catalogue pages
+    /_/showtimes/movie-{id}/near-{city}/d-{date}        Allocine showtimes days (JSON)
+"""
+### --- Imports ---
+import html
+import json
+import os
+import random
+import re
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+### --- Parameters ---
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+WATCHLIST_PAGE_SIZE = 28
+CATALOGUE_PAGE_SIZE = 15
+WORDS = [
+    "night", "blue", "queen", "dark", "day", "king", "river", "city", "last", "summer", "love", "war",
+    "ghost", "road", "silent", "house", "star", "winter", "lost", "heart", "red", "dream", "fire", "sea",
+    "nuit", "amour", "ville", "rouge", "temps", "vie", "mort", "soleil", "femme", "homme", "jour", "ciel",
+]
+DEPARTMENTS = ["75", "92", "93", "94", "77", "78", "91", "95"]
+
+
+### --- Templates ---
+def split_fixture(filename: str, item_start: str, item_end: str) -> tuple[str, str, str]:
+    """(head, first item, tail) of a fixture page, items being the repeated blocks starting with item_start
+
+    """
+    with open(os.path.join(FIXTURES_PATH, filename), "r", encoding="utf-8") as f:
+        markup = f.read()
+    first = markup.index(item_start)
+    second = markup.index(item_start, first + 1)
+    last = markup.rindex(item_start)
+    tail = markup.index(item_end, last) + len(item_end)
+    return markup[:first], markup[first:second], markup[tail:]
+
+WATCHLIST_HEAD, WATCHLIST_ITEM, WATCHLIST_TAIL = split_fixture(
+    "letterboxd_watchlist_page.html", '<li class="poster-container">', "</li>\n"
+)
+CATALOGUE_HEAD, CATALOGUE_ITEM, CATALOGUE_TAIL = split_fixture(
+    "allocine_films_page.html", '<li class="mdl">', "</li>\n"
+)
+with open(os.path.join(FIXTURES_PATH, "letterboxd_film.html"), "r", encoding="utf-8") as f:
+    FILM_PAGE = f.read()
+
+
+### --- Classes ---
+class SyntheticWorld:
+    """Users, watchlists, catalogue and theaters of a synthetic run, reproducible from seed.
+       Most watchlist films exist in the catalogue (under a slightly different title at times),
+       the others are absent, as for a real watchlist.
+    """
+
+    def __init__(self, nb_users: int = 4, watchlist_size: int = 100, catalogue_size: int = 20000,
+                 theaters_per_city: int = 50, nb_days: int = 30, date_start: str = "2026-10-19", seed: int = 0):
+        rnd = random.Random(seed)
+        self.date_start = date.fromisoformat(date_start)
+        self.nb_days = nb_days
+
+        # Allocine catalogue
+        self.catalogue = {}
+        for i in range(catalogue_size):
+            title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))).capitalize() + f" {i}"
+            self.catalogue[str(100000 + i)] = {
+                "ac_title": title,
+                "ac_url": f"https://www.allocine.fr/film/fichefilm_gen_cfilm={100000 + i}.html",
+                "ac_poster": f"https://fr.web.img1.acsta.net/c_310_420/pictures/{i}.jpg",
+                "ac_year": str(rnd.randint(1950, 2026)),
+                "ac_original_title": title if rnd.random() < 0.7 else None,
+            }
+        ac_ids = list(self.catalogue)
+
+        # Letterboxd films and watchlists
+        self.films = {}
+        self.users = {}
+        for u in range(nb_users):
+            slugs = []
+            for _ in range(watchlist_size):
+                ac_id = rnd.choice(ac_ids)
+                film = self.catalogue[ac_id]
+                if rnd.random() < 0.8:
+                    title = film["ac_title"] if rnd.random() < 0.8 else film["ac_title"].lower() + "!"
+                    slug = f"film-{ac_id}"
+                    year = film["ac_year"]
+                else:
+                    title = " ".join(rnd.choice(WORDS) for _ in range(3)) + f" unknown {len(self.films)}"
+                    slug = f"unknown-{len(self.films)}"
+                    year = str(rnd.randint(1950, 2026))
+                self.films[slug] = {"lb_title": title, "lb_year": year, "lb_original_title": None, "ac_id": ac_id}
+                slugs.append(slug)
+            self.users[f"user{u}"] = slugs
+
+        # Theaters near the city, and days each film is shown
+        self.theaters = [
+            {
+                "internalId": f"P{t:04d}",
+                "name": f"Cinema {t}",
+                "location": {
+                    "address": f"{t} rue du Cinema",
+                    "zip": rnd.choice(DEPARTMENTS) + f"{rnd.randint(0, 999):03d}",
+                    "city": "Paris",
+                },
+                "loyaltyCards": [],
+            }
+            for t in range(theaters_per_city)
+        ]
+        self._seed = seed
+
+    def watchlist_page(self, user: str, page_num: int) -> str | None:
+        slugs = self.users.get(user)
+        if slugs is None:
+            return None
+        nb_pages = max(1, -(-len(slugs) // WATCHLIST_PAGE_SIZE))
+        if page_num > nb_pages:
+            return None
+        page_slugs = slugs[(page_num - 1) * WATCHLIST_PAGE_SIZE:page_num * WATCHLIST_PAGE_SIZE]
+        items = [
+            re.sub(r'data-film-slug="[^"]*"', f'data-film-slug="{slug}"', WATCHLIST_ITEM)
+            for slug in page_slugs
+        ]
+        pagination = "".join(
+            f'<li class="paginate-page"><a href="/{user}/watchlist/page/{n}/">{n}</a></li>'
+            for n in range(1, nb_pages + 1)
+        )
+        tail = re.sub(
+            r'<div class="paginate-pages">.*?</div>',
+            f'<div class="paginate-pages"><ul>{pagination}</ul></div>' if nb_pages > 1 else "",
+            WATCHLIST_TAIL,
+            flags=re.S,
+        )
+        return WATCHLIST_HEAD + "".join(items) + tail
+
+    def film_page(self, slug: str) -> str | None:
+        film = self.films.get(slug)
+        if film is None:
+            return None
+        page = re.sub(
+            r'(<span class="name[^"]*">)[^<]*', lambda m: m.group(1) + html.escape(film["lb_title"]), FILM_PAGE, count=1
+        )
+        page = re.sub(r'(<span class="releasedate"><a[^>]*>)\d+', lambda m: m.group(1) + film["lb_year"], page, count=1)
+        return re.sub(r'<h2 class="originalname">.*?</h2>', "", page, count=1, flags=re.S)
+
+    def catalogue_page(self, page_num: int) -> str | None:
+        ac_ids = list(self.catalogue)[(page_num - 1) * CATALOGUE_PAGE_SIZE:page_num * CATALOGUE_PAGE_SIZE]
+        if not ac_ids:
+            return None
+        items = []
+        for ac_id in ac_ids:
+            film = self.catalogue[ac_id]
+            item = re.sub(r"cfilm=\d+", f"cfilm={ac_id}", CATALOGUE_ITEM)
+            item = re.sub(r'data-src="[^"]*"', f'data-src="{film["ac_poster"]}"', item)
+            item = re.sub(r'(class="meta-title-link"[^>]*>)[^<]*', lambda m: m.group(1) + html.escape(film["ac_title"]), item)
+            item = re.sub(r'(<span class="date">[^<]*)\b\d{4}\b', lambda m: m.group(1) + film["ac_year"], item)
+            if film["ac_original_title"]:
+                item = re.sub(r'(Titre original</span> <span class="dark-grey">)[^<]*',
+                              lambda m: m.group(1) + html.escape(film["ac_original_title"]), item)
+            else:
+                item = re.sub(r'<div class="meta-body-item"><span class="light">Titre original</span>.*?</div>', "", item)
+            items.append(item)
+        return CATALOGUE_HEAD + "".join(items) + CATALOGUE_TAIL
+
+    def showtimes_day(self, ac_id: str, day: str) -> dict:
+        """Showtimes payload of a film on a day: shown about one film out of two, in a few theaters,
+           with nextDate pointing to the next showing day as Allocine does
+        """
+        rnd = random.Random(f"{self._seed}-{ac_id}")
+        if ac_id not in self.catalogue or rnd.random() < 0.5:
+            return {"results": [], "nextDate": None}
+        shown_days = {d for d in range(self.nb_days) if rnd.random() < 0.6}
+        offset = (date.fromisoformat(day) - self.date_start).days
+        if offset not in shown_days:
+            next_days = [d for d in sorted(shown_days) if d > offset]
+            next_date = (self.date_start + timedelta(days=next_days[0])).isoformat() if next_days else None
+            return {"results": [], "nextDate": next_date}
+        return {
+            "results": [
+                {"theater": theater, "showtimes": showtimes}
+                for theater, showtimes in self._film_day_showtimes(ac_id, day)
+            ],
+            "nextDate": None,
+        }
+
+    def _film_day_showtimes(self, ac_id: str, day: str) -> list[tuple[dict, dict]]:
+        rnd = random.Random(f"{self._seed}-{ac_id}-{day}")
+        theaters = rnd.sample(self.theaters, max(1, len(self.theaters) // 5))
+        return [
+            (theater, {
+                "original": [
+                    {"startsAt": f"{day}T{h:02d}:{m:02d}:00", "diffusionVersion": "ORIGINAL"}
+                    for h, m in sorted({(rnd.randint(10, 22), rnd.choice([0, 15, 30, 45])) for _ in range(rnd.randint(1, 5))})
+                ],
+            })
+            for theater in theaters
+        ]
+
+
+### --- Server ---
+def make_handler(world: SyntheticWorld):
+    routes = [
+        (re.compile(r"^/([^/]+)/watchlist/(?:page/(\d+)/?)?$"), lambda m: world.watchlist_page(m.group(1), int(m.group(2) or 1))),
+        (re.compile(r"^/film/([^/]+)/?$"), lambda m: world.film_page(m.group(1))),
+        (re.compile(r"^/films/\?page=(\d+)$"), lambda m: world.catalogue_page(int(m.group(1)))),
+        (re.compile(r"^/_/showtimes/movie-([^/]+)/near-[^/]+/d-([\d-]+)$"), lambda m: world.showtimes_day(m.group(1), m.group(2))),
+    ]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            for pattern, route in routes:
+                match = pattern.match(self.path)
+                if match:
+                    body = route(match)
+                    break
+            else:
+                body = None
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if isinstance(body, dict):
+                content, content_type = json.dumps(body).encode("utf-8"), "application/json"
+            else:
+                content, content_type = body.encode("utf-8"), "text/html; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
+
+def serve(world: SyntheticWorld) -> tuple[ThreadingHTTPServer, str]:
+    """Starts the stand-in server in a background thread: (server, base url)
+
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(world))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
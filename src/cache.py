@@ -0,0 +1,115 @@
+### --- Imports ---
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+### --- Classes ---
+class ShowtimeCache:
+    """Showtimes payloads cache keyed by (ac_id, city_id, date), shared by all users and kept across runs.
+       Payloads are reused for ttl seconds, concurrent requests for a key wait for the first one.
+       With a path, payloads are also persisted in SQLite, for the next processes.
+    """
+
+    def __init__(self, path: str = None, ttl: float = 6 * 3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._payloads = {}  # {key: (future, fetched_at)}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS showtimes ("
+                "ac_id TEXT, city_id TEXT, date TEXT, payload TEXT, fetched_at REAL, "
+                "PRIMARY KEY (ac_id, city_id, date))"
+            )
+            self.prune()
+
+    def get_or_fetch(self, key: tuple[str, str, str], fetch) -> dict | None:
+        """Returns the payload of key, calling fetch() on a miss.
+           A None payload (failed request) is not cached.
+        """
+        with self._lock:
+            entry = self._payloads.get(key)
+            if entry is None or entry[1] < time.time() - self.ttl:
+                payload, fetched_at = self._load(key)
+                future = Future()
+                if payload is not None:
+                    future.set_result(payload)
+                entry = (future, fetched_at)
+                self._payloads[key] = entry
+                owner = payload is None
+            else:
+                future = entry[0]
+                owner = False
+            if owner:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                payload = fetch()
+            except Exception as e:
+                self._forget(key, entry)
+                future.set_exception(e)
+                raise
+            if payload is None:
+                self._forget(key, entry)
+            else:
+                self._store(key, payload)
+            future.set_result(payload)
+        return future.result()
+
+    def prune(self):
+        """Drops payloads older than ttl, in memory and in SQLite
+        
+        """
+        expired_at = time.time() - self.ttl
+        with self._lock:
+            for key in [key for key, (_, fetched_at) in self._payloads.items() if fetched_at < expired_at]:
+                del self._payloads[key]
+            if self._db:
+                self._db.execute("DELETE FROM showtimes WHERE fetched_at < ?", (expired_at,))
+                self._db.commit()
+
+    def _forget(self, key: tuple[str, str, str], entry: tuple):
+        with self._lock:
+            if self._payloads.get(key) is entry:
+                del self._payloads[key]
+
+    def _load(self, key: tuple[str, str, str]) -> tuple[dict | None, float]:
+        """(payload, fetched_at) persisted for key, (None, now) if there is none
+        
+        """
+        if self._db:
+            row = self._db.execute(
+                "SELECT payload, fetched_at FROM showtimes WHERE ac_id = ? AND city_id = ? AND date = ? AND fetched_at >= ?",
+                (*key, time.time() - self.ttl),
+            ).fetchone()
+            if row:
+                return json.loads(row[0]), row[1]
+        return None, time.time()
+
+    def _store(self, key: tuple[str, str, str], payload: dict):
+        if not self._db:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO showtimes VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            self._db.commit()
+
+    def stats(self) -> str:
+        """Hit/miss counter summary
+        
+        """
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"Showtimes cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hits)"
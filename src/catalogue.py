@@ -0,0 +1,243 @@
+### --- Imports ---
+import hashlib
+from array import array
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from utils import (
+    build_index,
+    build_title_index,
+    normalize_title,
+)
+from utils import (
+    ALLOCINE_FILMS_PATH,
+    ALLOCINE_FILMS_DB_PATH,
+    ALLOCINE_TITLE_INDEX_PATH,
+)
+
+
+### --- Parameters ---
+FILMS_COLUMNS = ["ac_title", "ac_url", "ac_poster", "ac_year", "ac_original_title"]
+
+
+### --- Classes ---
+class CatalogueStore(Mapping):
+    """Read-only {film_id: film} view of the SQLite catalogue.
+       Films are read on access, the catalogue is never loaded as a whole.
+    """
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def __getitem__(self, film_id: str) -> dict:
+        rows = self._query(f"SELECT {', '.join(FILMS_COLUMNS)} FROM films WHERE film_id = ?", (film_id,))
+        if not rows:
+            raise KeyError(film_id)
+        return dict(zip(FILMS_COLUMNS, rows[0]))
+
+    def __contains__(self, film_id) -> bool:
+        return bool(self._query("SELECT 1 FROM films WHERE film_id = ?", (film_id,)))
+
+    @property
+    def content_hash(self) -> str | None:
+        """Content hash of the catalogue, recorded when the file was written
+
+        """
+        rows = self._query("SELECT value FROM meta WHERE key = 'content_hash'")
+        return rows[0][0] if rows else None
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM films")[0][0]
+
+    def __iter__(self):
+        return (film_id for film_id, in self._query("SELECT film_id FROM films ORDER BY rowid"))
+
+    def items(self):
+        """(film_id, film) pairs in catalogue order, streamed from a single query
+
+        """
+        with self._lock:
+            cursor = self._db.execute(f"SELECT film_id, {', '.join(FILMS_COLUMNS)} FROM films ORDER BY rowid")
+            rows = cursor.fetchmany(1000)
+        while rows:
+            for film_id, *values in rows:
+                yield film_id, dict(zip(FILMS_COLUMNS, values))
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+
+
+class IndexTable(Mapping):
+    """Read-only {key: value} view of a title index table, values read on access.
+       key_sql and value_sql select the keys, and the rows of one key turned into its value by decode.
+    """
+
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock, key_sql: str, value_sql: str, decode):
+        self._db = db
+        self._lock = lock
+        self._key_sql = key_sql
+        self._value_sql = value_sql
+        self._decode = decode
+
+    def __getitem__(self, key):
+        with self._lock:
+            rows = self._db.execute(self._value_sql, (key,)).fetchall()
+        if not rows:
+            raise KeyError(key)
+        return self._decode(rows)
+
+    def __iter__(self):
+        with self._lock:
+            keys = self._db.execute(self._key_sql).fetchall()
+        return (key for key, in keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM ({self._key_sql})").fetchone()[0]
+
+
+### --- Functions ---
+def catalogue_hash(all_films: Mapping) -> str:
+    """Content hash of a catalogue, independent of its storage format
+
+    """
+    sha = hashlib.sha256()
+    for film_id, film in all_films.items():
+        sha.update(json.dumps([film_id, film], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return sha.hexdigest()
+
+def write_catalogue_db(all_films: dict, path: str):
+    """Writes the catalogue to SQLite, indexed on film id, normalized title and year.
+       The file is replaced atomically.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.execute(
+        "CREATE TABLE films (film_id TEXT PRIMARY KEY, "
+        + ", ".join(f"{column} TEXT" for column in FILMS_COLUMNS)
+        + ", norm_title TEXT)"
+    )
+    db.executemany(
+        f"INSERT INTO films VALUES (?, {', '.join('?' for _ in FILMS_COLUMNS)}, ?)",
+        (
+            (
+                film_id,
+                *(film.get(column) for column in FILMS_COLUMNS),
+                normalize_title(film.get("ac_original_title") or film.get("ac_title") or ""),
+            )
+            for film_id, film in all_films.items()
+        ),
+    )
+    db.execute("CREATE INDEX idx_films_norm_title ON films (norm_title)")
+    db.execute("CREATE INDEX idx_films_year ON films (ac_year)")
+    db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute("INSERT INTO meta VALUES ('content_hash', ?)", (catalogue_hash(all_films),))
+    db.commit()
+    db.close()
+    os.replace(tmp_path, path)
+
+def open_catalogue(db_path: str = ALLOCINE_FILMS_DB_PATH, json_path: str = ALLOCINE_FILMS_PATH) -> Mapping:
+    """Catalogue read lazily from SQLite when available, loaded from the JSON export otherwise
+
+    """
+    if os.path.exists(db_path):
+        return CatalogueStore(db_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_catalogue_hash(all_films: Mapping) -> str:
+    """Content hash recorded in the catalogue store, computed for an in-memory catalogue
+
+    """
+    return getattr(all_films, "content_hash", None) or catalogue_hash(all_films)
+
+def write_title_index(all_films: Mapping, path: str = ALLOCINE_TITLE_INDEX_PATH):
+    """Builds the title matching index of a catalogue and writes it to SQLite with the catalogue hash:
+       titles with their trigram count, their films, and trigram postings as packed arrays of title positions.
+       The file is replaced atomically.
+    """
+    title_index = build_title_index(build_index(all_films))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.execute("CREATE TABLE titles (position INTEGER PRIMARY KEY, title TEXT UNIQUE, nb_grams INTEGER)")
+    db.executemany(
+        "INSERT INTO titles VALUES (?, ?, ?)",
+        ((position, title, nb_grams) for position, (title, nb_grams) in enumerate(zip(title_index['titles'], title_index['nb_grams']))),
+    )
+    db.execute("CREATE TABLE title_films (position INTEGER, ac_id TEXT, ac_year TEXT)")
+    db.executemany(
+        "INSERT INTO title_films VALUES (?, ?, ?)",
+        (
+            (position, entry['ac_id'], entry['ac_year'])
+            for position, title in enumerate(title_index['titles']) for entry in title_index['entries'][title]
+        ),
+    )
+    db.execute("CREATE INDEX idx_title_films_position ON title_films (position)")
+    db.execute("CREATE TABLE grams (trigram TEXT PRIMARY KEY, positions BLOB)")
+    db.executemany(
+        "INSERT INTO grams VALUES (?, ?)",
+        ((trigram, array("I", positions).tobytes()) for trigram, positions in title_index['grams'].items()),
+    )
+    db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute("INSERT INTO meta VALUES ('catalogue_hash', ?)", (get_catalogue_hash(all_films),))
+    db.commit()
+    db.close()
+    os.replace(tmp_path, path)
+
+def open_title_index(path: str = ALLOCINE_TITLE_INDEX_PATH) -> dict:
+    """Title matching index read from SQLite, in build_title_index's format: titles and trigram counts
+       are loaded, trigram postings and title entries are read on access.
+    """
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    lock = threading.Lock()
+    rows = db.execute("SELECT title, nb_grams FROM titles ORDER BY position").fetchall()
+    return {
+        'titles': [title for title, _ in rows],
+        'nb_grams': array("I", (nb_grams for _, nb_grams in rows)),
+        'grams': IndexTable(
+            db, lock,
+            "SELECT trigram FROM grams",
+            "SELECT positions FROM grams WHERE trigram = ?",
+            lambda rows: array("I", rows[0][0]),
+        ),
+        'entries': IndexTable(
+            db, lock,
+            "SELECT title FROM titles ORDER BY position",
+            "SELECT ac_id, ac_year FROM title_films JOIN titles USING (position) WHERE title = ? ORDER BY title_films.rowid",
+            lambda rows: [{'ac_id': ac_id, 'ac_year': ac_year} for ac_id, ac_year in rows],
+        ),
+        'catalogue_hash': db.execute("SELECT value FROM meta WHERE key = 'catalogue_hash'").fetchone()[0],
+    }
+
+def load_title_index(all_films: Mapping, path: str = ALLOCINE_TITLE_INDEX_PATH) -> dict:
+    """Title matching index of a catalogue, opened from its SQLite file when up to date,
+       rebuilt (and written again) when missing or built from another catalogue
+    """
+    if os.path.exists(path):
+        title_index = open_title_index(path)
+        if title_index['catalogue_hash'] == get_catalogue_hash(all_films):
+            return title_index
+    print("[WARN] Title index missing or stale, rebuilding it")
+    write_title_index(all_films, path)
+    return open_title_index(path)
+
+
+### --- Converting JSON export to SQLite ---
+if __name__ == "__main__":
+    with open(ALLOCINE_FILMS_PATH, "r", encoding="utf-8") as f:
+        all_films = json.load(f)
+    write_catalogue_db(all_films, ALLOCINE_FILMS_DB_PATH)
+    write_title_index(all_films, ALLOCINE_TITLE_INDEX_PATH)
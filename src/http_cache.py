@@ -0,0 +1,128 @@
+### --- Imports ---
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+### --- Parameters ---
+STORED_HEADERS = ["Content-Type", "ETag", "Last-Modified"]
+
+
+### --- Classes ---
+class HTTPCache:
+    """On-disk cache of GET response bodies with their validators (ETag, Last-Modified).
+       Only URLs matching one of the ttls patterns are cached: within its TTL a body is served
+       without any request, past it the request is made conditional and a 304 is served from disk.
+       Entries not revalidated for max_age seconds are dropped when the cache is opened.
+    """
+
+    def __init__(self, path: str, ttls: list[tuple[str, float]], max_age: float = 30 * 86400):
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, headers TEXT, body BLOB, fetched_at REAL)"
+        )
+        self._db.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age,))
+        self._db.commit()
+
+    def ttl(self, url: str) -> float | None:
+        """TTL of url's first matching pattern, None if url is not cached
+
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return None
+
+    def lookup(self, url: str) -> tuple[dict, bytes, bool] | None:
+        """(headers, body, fresh) stored for url, None if absent
+
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT headers, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        headers, body, fetched_at = row
+        return json.loads(headers), zlib.decompress(body), time.time() - fetched_at < self.ttl(url)
+
+    def store(self, url: str, response: requests.Response):
+        """Stores a 200 response, unless the server forbids it
+
+        """
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (url, json.dumps(headers), zlib.compress(response.content), time.time()),
+            )
+            self._db.commit()
+
+    def touch(self, url: str):
+        """Marks url's stored body as fresh again, after a 304
+
+        """
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def count(self, outcome: str):
+        """Increments the hits, revalidated or misses counter
+
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> str:
+        """Hit/revalidation/miss counter summary
+
+        """
+        total = self.hits + self.revalidated + self.misses
+        rate = (self.hits + self.revalidated) / total if total else 0
+        return (f"HTTP cache: {self.hits} fresh hits, {self.revalidated} revalidated (304), "
+                f"{self.misses} misses ({rate:.0%} served from disk)")
+
+
+### --- Functions ---
+def conditional_headers(headers: dict) -> dict:
+    """If-None-Match / If-Modified-Since headers from stored validators
+
+    """
+    conditional = {}
+    if "ETag" in headers:
+        conditional["If-None-Match"] = headers["ETag"]
+    if "Last-Modified" in headers:
+        conditional["If-Modified-Since"] = headers["Last-Modified"]
+    return conditional
+
+def cached_response(request: requests.PreparedRequest, headers: dict, body: bytes) -> requests.Response:
+    """200 Response built from a stored body, flagged with from_cache
+
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = request.url
+    response.request = request
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response.from_cache = True
+    return response
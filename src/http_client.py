@@ -0,0 +1,114 @@
+### --- Imports ---
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import HTTPCache, cached_response, conditional_headers
+from metrics import RunMetrics
+from rate_limit import RateLimiter
+
+
+### --- Parameters ---
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+}
+
+
+### --- Classes ---
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter waiting for its host's slot before each request,
+       and reporting responses (including retried 429s) to the limiter.
+       With a cache, cached GETs are served from disk or sent as conditional requests.
+       With metrics, each request is recorded (time waited, time on the wire, retries, 429s).
+    """
+
+    def __init__(self, limiter: RateLimiter, cache: HTTPCache = None, metrics: RunMetrics = None, **kwargs):
+        self.limiter = limiter
+        self.cache = cache
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        ttl = self.cache.ttl(request.url) if self.cache and request.method == "GET" else None
+        if ttl is None:
+            return self._send(request, **kwargs)
+
+        stored = self.cache.lookup(request.url)
+        if stored:
+            headers, body, fresh = stored
+            if fresh:
+                self.cache.count("hits")
+                if self.metrics:
+                    self.metrics.record_request(request.url, 200, from_cache=True)
+                return cached_response(request, headers, body)
+            request.headers.update(conditional_headers(headers))
+        response = self._send(request, **kwargs)
+        if stored and response.status_code == 304:
+            self.cache.count("revalidated")
+            self.cache.touch(request.url)
+            response.content  # drains the empty body, giving the connection back to the pool
+            response.close()
+            return cached_response(request, headers, body)
+        self.cache.count("misses")
+        if response.status_code == 200 and (ttl > 0 or conditional_headers(response.headers)):
+            self.cache.store(request.url, response)
+        return response
+
+    def _send(self, request, **kwargs):
+        waited = self.limiter.acquire(request.url)
+        start = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            if self.metrics:
+                self.metrics.record_request(request.url, None, time.monotonic() - start, waited)
+            raise
+        retries = getattr(response.raw, "retries", None)
+        history = retries.history if retries else ()
+        for attempt in history:
+            if attempt.status == 429:
+                self.limiter.feedback(request.url, 429)
+        self.limiter.feedback(request.url, response.status_code, parse_retry_after(response))
+        if self.metrics:
+            self.metrics.record_request(
+                request.url,
+                response.status_code,
+                time.monotonic() - start,
+                waited,
+                retries=len(history),
+                throttled=sum(attempt.status == 429 for attempt in history) + (response.status_code == 429),
+            )
+        return response
+
+
+### --- Functions ---
+def parse_retry_after(response) -> float | None:
+    """Retry-After delay of a response in seconds, None if absent or not in seconds
+
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.strip().isdigit():
+        return float(retry_after)
+    return None
+
+def create_session(limiter: RateLimiter, pool_maxsize: int = 10, cache: HTTPCache = None,
+                   metrics: RunMetrics = None) -> requests.Session:
+    """Session with browser headers, retries with backoff on 429/5xx, per-host rate limiting,
+       optional on-disk cache (conditional requests) and optional request metrics
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry_strategy = Retry(
+        total=5,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET", "OPTIONS", "POST"]
+    )
+    adapter = RateLimitedAdapter(limiter, cache=cache, metrics=metrics, max_retries=retry_strategy, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,110 @@
+### --- Imports ---
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from parsing import (
+    parse_film_details,
+    parse_watchlist_nb_pages,
+    parse_watchlist_slugs,
+)
+from utils import safe_get
+from utils import URL_LETTERBOXD
+
+
+### --- Parameters ---
+PARSE_ERRORS = (AttributeError, IndexError, KeyError, TypeError, ValueError)  # unexpected markup
+
+
+### --- Functions ---
+def fetch_watchlist_page(url_watchlist_page: str, session) -> list[str]:
+    """Film slugs of a watchlist page, empty if the page could not be retrieved or parsed
+    
+    """
+    r_page = safe_get(url_watchlist_page, session)
+    if not r_page:
+        print(f"[SKIP] Impossible to retrieve {url_watchlist_page}")
+        return []
+    try:
+        return parse_watchlist_slugs(r_page.content)
+    except PARSE_ERRORS as e:
+        print(f"[SKIP] Impossible to parse {url_watchlist_page} → {e!r}")
+        return []
+
+def fetch_film_metadata(slug_movie: str, session) -> dict | None:
+    """Title, original title and year of a Letterboxd film, None if the page could not be retrieved or parsed
+    
+    """
+    url_movie = urllib.parse.urljoin(URL_LETTERBOXD, f"film/{slug_movie}")
+    r_movie = safe_get(url_movie, session)
+    if not r_movie:
+        print(f"[SKIP] Impossible to retrieve {url_movie}")
+        return None
+    try:
+        return parse_film_details(r_movie.content)
+    except PARSE_ERRORS as e:
+        print(f"[SKIP] Impossible to parse {url_movie} → {e!r}")
+        return None
+
+def make_watchlist_movie(slug_movie: str, movie_details: dict) -> dict:
+    """Watchlist movie record from film details
+    
+    """
+    return {
+        "lb_title": movie_details["lb_title"],
+        "lb_url": urllib.parse.urljoin(URL_LETTERBOXD, f"film/{slug_movie}"),
+        "lb_year": movie_details["lb_year"],
+        "lb_original_title": movie_details["lb_original_title"],
+    }
+
+def iter_watchlist_batches(user_name: str, session, known_films: dict, max_workers: int = 4, metrics=None):
+    """Yields batches [(position, slug, movie)] of the films of a user's watchlist, as soon as they are available.
+       Watchlist pages are fetched concurrently, films of known_films are yielded in one batch with their page
+       and the others once their film page arrives, with the film pages arrived at the same time.
+       position = (page, rank) gives the watchlist order. With metrics, film pages are timed as the "metadata" stage.
+       Raises RuntimeError when the watchlist cannot be retrieved.
+    """
+    fetch_metadata = metrics.timed("metadata", fetch_film_metadata) if metrics else fetch_film_metadata
+    url_watchlist = urllib.parse.urljoin(URL_LETTERBOXD, f"{user_name}/watchlist/")
+    r = safe_get(url_watchlist, session)
+    if not r:
+        raise RuntimeError(f"Impossible to retrieve {url_watchlist}")
+    try:
+        nb_pages = parse_watchlist_nb_pages(r.content)
+    except PARSE_ERRORS as e:
+        print(f"[WARN] Impossible to parse the pagination of {url_watchlist} → {e!r}, first page only")
+        nb_pages = 1
+    print(f"Pages total: {nb_pages}")
+
+    seen = set()
+    nb_new = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(fetch_watchlist_page, urllib.parse.urljoin(url_watchlist, f"page/{page_num}"), session): page_num
+            for page_num in range(2, nb_pages + 1)
+        }
+        done = [(1, parse_watchlist_slugs(r.content))]
+        while done or pending:
+            batch = []
+            for key, result in done:
+                if isinstance(key, int):
+                    # Watchlist page: known films are ready, the others go to the film page stage
+                    for rank, slug_movie in enumerate(result):
+                        if slug_movie in seen:
+                            continue
+                        seen.add(slug_movie)
+                        if slug_movie in known_films:
+                            batch.append(((key, rank), slug_movie, make_watchlist_movie(slug_movie, known_films[slug_movie])))
+                        else:
+                            nb_new += 1
+                            pending[executor.submit(fetch_metadata, slug_movie, session)] = ((key, rank), slug_movie)
+                elif result:
+                    # Film page
+                    position, slug_movie = key
+                    batch.append((position, slug_movie, make_watchlist_movie(slug_movie, result)))
+            if batch:
+                yield batch
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            done = [(pending.pop(future), future.result()) for future in finished]
+    print(f"{len(seen)} films, {nb_new} new")
@@ -0,0 +1,101 @@
+### --- Imports ---
+import os
+import smtplib
+import ssl
+import threading
+
+
+### --- Parameters ---
+MAILER_MAX_RECONNECTS = 3
+
+
+### --- Classes ---
+class Mailer:
+    """Collects rendered messages and sends them in one batch over a single authenticated connection.
+       The connection is reopened when the server drops it; failures are reported per message.
+       With sink_dir set (dry run), messages are written there as .eml files instead of being sent.
+    """
+
+    def __init__(self, sender: str, password: str = None, host: str = "smtp.gmail.com", port: int = 465,
+                 use_ssl: bool = True, sink_dir: str = None):
+        self.sender = sender
+        self.password = password
+        self.host = host
+        self.port = int(port)
+        self.use_ssl = use_ssl
+        self.sink_dir = sink_dir
+        self._outbox = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add(self, to_addr: str, message):
+        """Queues a message for to_addr, sent by the next send_all
+
+        """
+        message["To"] = to_addr
+        with self._lock:
+            self._outbox.append((to_addr, message.as_string()))
+
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, port=self.port, context=ssl.create_default_context())
+        else:
+            server = smtplib.SMTP(self.host, port=self.port)
+        if self.password:
+            server.login(user=self.sender, password=self.password)
+        self._server = server
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def _send(self, to_addr: str, msg: str):
+        """Sends one message on the open connection, reconnecting if it was dropped
+
+        """
+        for attempt in range(MAILER_MAX_RECONNECTS + 1):
+            try:
+                if self._server is None:
+                    self._connect()
+                self._server.sendmail(from_addr=self.sender, to_addrs=to_addr, msg=msg)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._server = None
+                if attempt == MAILER_MAX_RECONNECTS:
+                    raise
+
+    def _write(self, index: int, to_addr: str, msg: str):
+        os.makedirs(self.sink_dir, exist_ok=True)
+        path = os.path.join(self.sink_dir, f"{index:04d}_{to_addr.replace('@', '_at_')}.eml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(msg)
+
+    def send_all(self) -> list[tuple[str, str | None]]:
+        """Sends (or writes) every queued message and empties the outbox.
+           Returns (to_addr, None if sent or error message) pairs in queuing order.
+        """
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+        results = []
+        try:
+            for index, (to_addr, msg) in enumerate(outbox):
+                try:
+                    if self.sink_dir:
+                        self._write(index, to_addr, msg)
+                    else:
+                        self._send(to_addr, msg)
+                    results.append((to_addr, None))
+                except (smtplib.SMTPException, OSError) as e:
+                    error = f"{type(e).__name__}: {e}"
+                    results.append((to_addr, error))
+                    if isinstance(e, smtplib.SMTPAuthenticationError):
+                        # Same credentials for every message, no point going on
+                        results.extend((other_addr, error) for other_addr, _ in outbox[index + 1:])
+                        break
+        finally:
+            self._close()
+        return results
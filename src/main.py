@@ -1,71 +1,105 @@
 ### --- Imports ---
 print("Imports...")
-import requests
-from bs4 import BeautifulSoup
-import urllib
 from pprint import pprint
 import json
-from collections import defaultdict
-import random
-import time
 from datetime import datetime, timedelta
-import smtplib
-import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from html import escape
 from dotenv import load_dotenv
 import os
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from utils import (
-    build_index, 
-    find_closest_id, 
-    google_maps_link,
-    safe_get
+    load_json,
+    dump_json,
 )
+from cache import ShowtimeCache
+from catalogue import load_title_index, open_catalogue
+from http_cache import HTTPCache
+from http_client import create_session
+from letterboxd import iter_watchlist_batches
+from mailer import Mailer
+from mapping import get_ac_id, resolve_slugs
+from metrics import RunMetrics
+from rate_limit import RateLimiter
+from render import programme_cards, render_programme_html, render_programme_text
+from showtimes import fetch_film_programme
+from theaters import TheaterRegistry
 from utils import (
     ALLOCINE_CITIES_PATH, 
     ALLOCINE_FILMS_PATH, 
+    ALLOCINE_FILMS_DB_PATH,
+    ALLOCINE_TITLE_INDEX_PATH,
     USERS_INFO_PATH,
+    LETTERBOXD_FILMS_CACHE_PATH,
+    LB_TO_AC_MAPPING_PATH,
+    LB_TO_AC_OVERRIDES_PATH,
     WATCHLIST_PATH,
     WATCHLIST_FILENAME,
     PROGRAMME_PATH,
     PROGRAMME_FILENAME,
-    URL_LETTERBOXD,
-    URL_ALLOCINE_SHOWTIMES,
+    RATE_LIMITS,
+    LETTERBOXD_MAX_WORKERS,
+    SHOWTIMES_MAX_WORKERS,
+    USERS_MAX_WORKERS,
+    SHOWTIMES_CACHE_PATH,
+    SHOWTIMES_CACHE_TTL,
+    HTTP_CACHE_PATH,
+    HTTP_CACHE_TTLS,
+    RUN_REPORTS_PATH,
+    THEATERS_PATH,
 )
 
 
 ### --- Settings scraping ---
-session = requests.Session()
-session.headers.update({
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
-    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-})
-retry_strategy = Retry(
-    total=5,
-    backoff_factor=2,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["HEAD", "GET", "OPTIONS", "POST"]
-)
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session.mount("http://", adapter)
-session.mount("https://", adapter)
+metrics = RunMetrics("main")
+limiter = RateLimiter(RATE_LIMITS)
+http_cache = HTTPCache(HTTP_CACHE_PATH, HTTP_CACHE_TTLS)
+session = create_session(limiter, pool_maxsize=USERS_MAX_WORKERS * SHOWTIMES_MAX_WORKERS, cache=http_cache, metrics=metrics)
 
 
 ### --- Loading data ---
+def load_catalogue():
+    """(Re)loads the Allocine catalogue and its title index, e.g. after scraping_all_films.py refreshed them
+    
+    """
+    global allocine_films, allocine_title_index, catalogue_mtime
+    catalogue_mtime = catalogue_modified_at()
+    allocine_films = open_catalogue(ALLOCINE_FILMS_DB_PATH, ALLOCINE_FILMS_PATH)
+    print("Loading Allocine title index...")
+    allocine_title_index = load_title_index(allocine_films, ALLOCINE_TITLE_INDEX_PATH)
+
+def catalogue_modified_at() -> float | None:
+    """Modification time of the catalogue file main.py reads, None if there is none
+    
+    """
+    for path in [ALLOCINE_FILMS_DB_PATH, ALLOCINE_FILMS_PATH]:
+        if os.path.exists(path):
+            return os.path.getmtime(path)
+    return None
+
+def load_users() -> list[dict]:
+    """Users to email, read again at each call
+    
+    """
+    with open(USERS_INFO_PATH, "r", encoding='utf-8') as file:
+        return json.load(file)
+
 print("Loading data...")
-with open(ALLOCINE_FILMS_PATH, "r", encoding='utf-8') as file:
-    allocine_films = json.load(file)
+load_catalogue()
 
 with open(ALLOCINE_CITIES_PATH, "r", encoding='utf-8') as file:
     allocine_cities_id = json.load(file)
 
-with open(USERS_INFO_PATH, "r", encoding='utf-8') as file:
-    users_info = json.load(file)
+letterboxd_films = load_json(LETTERBOXD_FILMS_CACHE_PATH, default={})
+letterboxd_films_lock = threading.Lock()
+
+lb_to_ac_mapping = load_json(LB_TO_AC_MAPPING_PATH, default={})
+lb_to_ac_overrides = load_json(LB_TO_AC_OVERRIDES_PATH, default={})
+lb_to_ac_lock = threading.Lock()
+
+theater_registry = TheaterRegistry.load(THEATERS_PATH)
 
 
 ### --- Parameters ---
@@ -76,342 +110,203 @@ load_dotenv()
 EMAIL_SENDER = os.getenv("EMAIL_SENDER")
 EMAIL_PORT = os.getenv("EMAIL_PORT")
 EMAIL_PWD = os.getenv("EMAIL_PWD")
+EMAIL_PLAIN_TEXT = os.getenv("EMAIL_PLAIN_TEXT")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_SSL = os.getenv("EMAIL_SSL", "1") != "0"
+EMAIL_SINK_DIR = os.getenv("EMAIL_SINK_DIR")
+mailer = Mailer(EMAIL_SENDER, EMAIL_PWD, host=EMAIL_HOST, port=EMAIL_PORT or 465, use_ssl=EMAIL_SSL, sink_dir=EMAIL_SINK_DIR)
 
-## Date parameters
-date_today = datetime.today().strftime('%Y-%m-%d')
-date_max = (datetime.today() + timedelta(days=30)).strftime('%Y-%m-%d')
-
-
-### --- Scraping watchlist movies showtimes ---
-print("Scraping watchlist movies showtimes...")
+## Cache parameters
+# Showtimes kept across runs for SHOWTIMES_CACHE_TTL, and for the next processes with SHOWTIMES_CACHE_PERSIST
+SHOWTIMES_CACHE_PERSIST = os.getenv("SHOWTIMES_CACHE_PERSIST")
+showtimes_cache = ShowtimeCache(SHOWTIMES_CACHE_PATH if SHOWTIMES_CACHE_PERSIST else None, ttl=SHOWTIMES_CACHE_TTL)
 
-ONLY_USER = os.getenv("ONLY_USER")  
+## Run parameters
+run_lock = threading.Lock()
 
-for user in users_info:
 
+### --- Functions ---
+def programme_dates() -> tuple[str, str]:
+    """(today, last day) of the programme looked for, 30 days from today
+    
+    """
+    return datetime.today().strftime('%Y-%m-%d'), (datetime.today() + timedelta(days=30)).strftime('%Y-%m-%d')
+
+def resolve_films(lb_movies: dict) -> dict:
+    """Allocine ids {lb_id: ac_id} of a batch of watchlist films, from the mapping store
+       or matched (and stored) together if new
+    """
+    with letterboxd_films_lock:
+        for lb_id, lb_movie in lb_movies.items():
+            letterboxd_films[lb_id] = {
+                "lb_title": lb_movie["lb_title"],
+                "lb_year": lb_movie["lb_year"],
+                "lb_original_title": lb_movie["lb_original_title"],
+            }
+    with lb_to_ac_lock, metrics.stage("matching"):
+        resolve_slugs(lb_movies, allocine_title_index, lb_to_ac_mapping, lb_to_ac_overrides)
+        return {lb_id: get_ac_id(lb_id, lb_to_ac_mapping, lb_to_ac_overrides) for lb_id in lb_movies}
+
+def process_user(user: dict) -> str | None:
+    """Scrapes a user's watchlist, looks for its movies showtimes and queues the programme email.
+       Stages are streamed: films are matched as soon as their watchlist info arrives, one batch per
+       watchlist page or film pages arrived together, and their showtimes fetched and grouped by day
+       while the rest of the watchlist is scraped.
+       Errors are reported and returned, and do not stop the other users.
+    """
     try:
-        if ONLY_USER and (user.get("lb_profile_id") != ONLY_USER and user.get("email_address") != ONLY_USER):
-            continue
-        
-        # Avoid blocking
         print(f"User {user}")
-        time.sleep(random.uniform(5, 10))
 
         ## User parameters
+        date_today, date_max = programme_dates()
         user_name = user['lb_profile_id']
         user_email = user['email_address']
         user_city_id = allocine_cities_id[user['city']]
         user_departments_subset = user['departments_subset']
 
-        ## Watchlist's number of pages
-        print("Finding watchlist's number of pages...")
-        link_user_watchlist = f"{user_name}/watchlist/"
-        url_watchlist = urllib.parse.urljoin(URL_LETTERBOXD, link_user_watchlist)
-        r = session.get(url_watchlist)
-        soup = BeautifulSoup(r.content, 'html.parser')
-        div_pages = soup.find("div", class_="paginate-pages")
-        if div_pages:
-            nb_pages = int(div_pages.find_all("a")[-1].get_text())
-        else:
-            nb_pages = 1
-        print(f"Pages total: {nb_pages}")
-
-        ## Watchlist movies
-        print("Retrieving watchlist movies...")
+        ## Watchlist movies -> Allocine movie info -> movies showtimes -> showtimes by day
+        print("Retrieving watchlist movies and their showtimes...")
+        positions = {}
         watchlist_movies = {}
-        for page_num in range(1, 2):
-
-            # Avoid blocking
-            print(f"Page {page_num}")
-            time.sleep(random.uniform(10, 30))
-
-            # Retrieve watchlist page x movies
-            link_page = f"page/{page_num}"
-            url_watchlist_page = urllib.parse.urljoin(url_watchlist, link_page)
-            r_page = safe_get(url_watchlist_page, session)
-            if not r_page:
-                print(f"[SKIP] Impossible to retrieve {url_watchlist_page}")
-                continue
-            soup_page = BeautifulSoup(r_page.content, 'html.parser')
-            div_movies = soup_page.find_all("li", class_="poster-container")
-
-            # Retrieve movie info
-            for m, mov in enumerate(div_movies[:5]):
-
-                # Avoid blocking
-                print(f"Movie {m+1}")
-                time.sleep(random.uniform(10, 30))
-
-                # Retrieve movie url
-                slug_movie = mov.find("div").get("data-film-slug")
-                link_movie = f"film/{slug_movie}"
-                url_movie = urllib.parse.urljoin(URL_LETTERBOXD, link_movie)
-
-                # Retrieve movie info: title, original title if available, year and poster
-                r_movie = safe_get(url_movie, session)
-                if not r_movie:
-                    print(f"[SKIP] Impossible to retrieve {url_movie}")
-                    continue
-                soup_movie = BeautifulSoup(r_movie.content, 'html.parser')
-                div_details = soup_movie.find("div", class_="details")
-                # titles
-                movie_title = div_details.find("h1", class_="headline-1").find('span').get_text()
-                original_bool = div_details.find("h2", class_="originalname")
-                movie_original_title = original_bool.find("em").get_text() if original_bool else None
-                # year
-                movie_year = div_details.find('span', class_="releasedate").get_text().strip() if div_details.find('span', class_="releasedate") else None
-                
-                # Append movie to watchlist dict
-                watchlist_movies[slug_movie] = {
-                    "lb_title": movie_title,
-                    "lb_url": url_movie,
-                    "lb_year": movie_year,
-                    "lb_original_title": movie_original_title,
-                } 
-
-        # Export watchlist movies
-        print("Exporting watchlist movies...")
-        user_watchlist_path = WATCHLIST_PATH + user_name + WATCHLIST_FILENAME
-        with open(user_watchlist_path, "w", encoding="utf-8") as f:
-            json.dump(watchlist_movies, f, ensure_ascii=False, indent=2)
-
-
-        ## Allocine movie info
-        print("Retrieving Allocine movie info...")
-        allocine_title_to_id_year = build_index(allocine_films)
-
-        for lb_id, lb_movie in watchlist_movies.items():
-            lb_title_request = lb_movie.get("lb_original_title") or lb_movie.get("lb_title")
-            lb_year = lb_movie.get("lb_year")
-            ac_id = find_closest_id(lb_title_request, allocine_title_to_id_year, lb_year)
-            lb_movie.update({'ac_id': ac_id})
-
-
-        ## Look for movies showtimes
-        print("Looking for movies showtimes...")
-        all_films_showtimes = {}
-
-        for lb_id, lb_movie in watchlist_movies.items():
-            film_id = lb_movie["ac_id"]
-            if film_id:
-                link_movie_near = f"movie-{film_id}/near-{user_city_id}/d-"
-                url_film = urllib.parse.urljoin(URL_ALLOCINE_SHOWTIMES, link_movie_near)
-                next_date = date_today
-                film_showtimes = []
-                while next_date and next_date <= date_max:
-                    url_film_date = url_film + next_date
-                    res = session.get(url_film_date)
-                    if res.status_code == 200:
-                        results = res.json()['results']
-                        if results:
-                            film_showtimes.extend(
-                                [
-                                    {
-                                        'theater_name': elem['theater']['name'],
-                                        'theater_full_address': ' '.join(
-                                            [
-                                                elem['theater']['location']['address'],
-                                                elem['theater']['location']['zip'],
-                                                elem['theater']['location']['city']
-                                            ]
-                                        ),
-                                        'theater_maps': google_maps_link(elem['theater']['location']['address'] + elem['theater']['location']['zip'] + elem['theater']['location']['city']),
-                                        'theater_showtimes': [
-                                            (showtime['startsAt'], showtime['diffusionVersion'])
-                                            for showtime in sum(elem['showtimes'].values(), [])
-                                        ],
-                                        'theater_tickets': elem['theater']['loyaltyCards']
-                                    }
-                                    for elem in results if
-                                    any(elem['theater']['location']['zip'].startswith(dept_ok) for dept_ok in user_departments_subset)
-                                ]
-                            )
-                            next_date = (datetime.strptime(next_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
-                        else:
-                            next_date = res.json()['nextDate']
-            else:
-                film_showtimes = []
-
-            all_films_showtimes[lb_id] = {
-                'ac_id': film_id,
-                'showtimes': film_showtimes,
-            }
-
-
-        # Export movies showtimes
-        print("Exporting movies showtimes...")
-        user_programme_path = PROGRAMME_PATH + user_name + "_" + date_today + PROGRAMME_FILENAME
-        with open(user_programme_path, "w", encoding="utf-8") as f:
-            json.dump(all_films_showtimes, f, ensure_ascii=False, indent=2)
-
-
-
-
-        ### --- Process output for email ---
-        print("Processing output for email...")
-        all_films_showtimes_by_day = {}
-        for lb_id, showtimes_info in all_films_showtimes.items():
-            daily_info = defaultdict(list)
-            for theater in showtimes_info['showtimes']:
-                theater_name = theater['theater_name']
-                theater_address = theater['theater_full_address']
-                theater_maps = theater['theater_maps']
-                theater_tickets = theater['theater_tickets']
-                for showtime in theater['theater_showtimes']:
-                    showtime_day_date = datetime.strptime(showtime[0].split('T')[0], '%Y-%m-%d')
-                    showtime_day_number = datetime.strftime(showtime_day_date,'%d')
-                    showtime_day_name = datetime.strftime(showtime_day_date,'%A')
-                    showtime_month_name = datetime.strftime(showtime_day_date,'%B')
-                    showtime_year = datetime.strftime(showtime_day_date,'%Y')
-                    showtime_date_name = ' '.join([showtime_day_name, showtime_day_number, showtime_month_name, showtime_year])
-                    showtime_hour = showtime[0].split('T')[1][:5].replace(':','h')
-                    if (showtime_hour >= "18h00") | (showtime_day_name in ['Saturday', 'Sunday']):
-                        daily_info[showtime_date_name].append(
-                            {
-                                'theater_name': theater_name,
-                                'theater_address': theater_address,
-                                'theater_maps': theater_maps,
-                                'showtime_hour': showtime_hour,
-                                'theater_tickets': theater_tickets,
-                            }
-                        )
-            all_films_showtimes_by_day[lb_id] = dict(daily_info)
-
-
-
-        ### --- Send email ---
-        print("Sending email...")
+        programme_futures = {}
+        with ThreadPoolExecutor(max_workers=SHOWTIMES_MAX_WORKERS) as executor:
+            submit_film = lambda ac_id: executor.submit(
+                metrics.timed("showtimes", fetch_film_programme),
+                ac_id,
+                user_city_id,
+                user_departments_subset,
+                session,
+                date_today,
+                date_max,
+                theaters=theater_registry,
+                cache=showtimes_cache,
+            )
+            watchlist = iter_watchlist_batches(user_name, session, letterboxd_films, LETTERBOXD_MAX_WORKERS, metrics=metrics)
+            for batch in metrics.timed_iter("watchlist", watchlist):
+                for position, lb_id, lb_movie in batch:
+                    positions[lb_id] = position
+                batch_movies = {lb_id: lb_movie for _, lb_id, lb_movie in batch}
+                watchlist_movies.update(batch_movies)
+                for lb_id, ac_id in resolve_films(batch_movies).items():
+                    programme_futures[lb_id] = (ac_id, submit_film(ac_id))
+
+            # Back to watchlist order
+            watchlist_movies = dict(sorted(watchlist_movies.items(), key=lambda item: positions[item[0]]))
+            all_films_showtimes = {}
+            all_films_showtimes_by_day = {}
+            for lb_id in watchlist_movies:
+                ac_id, future = programme_futures[lb_id]
+                film_showtimes, film_showtimes_by_day = future.result()
+                all_films_showtimes[lb_id] = {
+                    'ac_id': ac_id,
+                    'showtimes': film_showtimes,
+                }
+                all_films_showtimes_by_day[lb_id] = film_showtimes_by_day
+
+        with metrics.stage("export"):
+            # Export watchlist movies
+            print("Exporting watchlist movies...")
+            user_watchlist_path = WATCHLIST_PATH + user_name + WATCHLIST_FILENAME
+            with open(user_watchlist_path, "w", encoding="utf-8") as f:
+                json.dump(watchlist_movies, f, ensure_ascii=False, indent=2)
+
+            # Export movies showtimes
+            print("Exporting movies showtimes...")
+            user_programme_path = PROGRAMME_PATH + user_name + "_" + date_today + PROGRAMME_FILENAME
+            with open(user_programme_path, "w", encoding="utf-8") as f:
+                json.dump(all_films_showtimes, f, ensure_ascii=False, indent=2)
+
+
+
+        ### --- Queue email ---
+        print("Queuing email...")
         if all_films_showtimes_by_day:   
             
-            context = ssl.create_default_context()
             message = MIMEMultipart("alternative")
             message["Subject"] = "Films au cinema - " + date_today
             message["From"] = EMAIL_SENDER
             
-            missing_allocine = []
-            
             # Email body
-            html = """\
-            <html>
-                <head>
-                <meta name="viewport" content="width=device-width, initial-scale=1">        
-                </head>
-                <body>
-                    <div class="container">
-            """
-            
-            for lb_id, film_showtimes in all_films_showtimes_by_day.items():
-                if not film_showtimes:
-                    # no showtime, checking if ac_id problem
-                    if not (all_films_showtimes.get(lb_id, {}).get("ac_id")):
-                        missing_allocine.append({
-                            "lb_title": watchlist_movies[lb_id]["lb_title"],
-                            "lb_url": watchlist_movies[lb_id]["lb_url"],
-                        })
-                    continue
-
-                ac_id = (all_films_showtimes.get(lb_id) or {}).get("ac_id")
-                if not ac_id or ac_id not in allocine_films:
-                    # no ac_id: add to missing_allocine to alert user
-                    missing_allocine.append({
-                        "lb_title": watchlist_movies[lb_id]["lb_title"],
-                        "lb_url": watchlist_movies[lb_id]["lb_url"],
-                    })
-                    continue
-
-                film_name  = allocine_films[ac_id].get("ac_title") or "Titre inconnu"
-                film_poster = allocine_films[ac_id].get("ac_poster") or "https://via.placeholder.com/120x180?text=No+Poster"
-
-                # Movie card
-                html += f"""\
-                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0"
-                    style="margin-bottom:30px; background:#ffffff; border:1px solid #ddd; border-radius:10px; overflow:hidden;">
-                <tr>
-                    <!-- colonne affiche -->
-                    <td width="120" valign="top" style="padding:12px;">
-                    <img src="{escape(film_poster)}" alt="Affiche de {escape(film_name)}" width="120" height="180"
-                        style="display:block; width:120px; height:180px; border-radius:6px; border:0; outline:none;">
-                    </td>
-
-                    <!-- colonne texte -->
-                    <td valign="top" style="padding:12px 16px; font-family:Arial,Helvetica,sans-serif;">
-                    <h2 style="margin:0 0 8px 0; font-size:20px; font-weight:bold; color:#EF0107;">
-                        {escape(film_name)}
-                    </h2>
-                """
-
-                # Showtimes per day
-                for showtime_day, showtime_infos in film_showtimes.items():
-                    html += f"""\
-                    <div style="margin:10px 0;">
-                        <div style="background:#f9f2dc; color:#9C824A; font-size:15px; font-weight:bold;
-                                    padding:6px 10px; border-radius:4px; display:inline-block; margin-bottom:6px;">
-                        {escape(str(showtime_day))}
-                        </div>
-                        <ul style="margin:0; padding-left:20px; font-size:14px; line-height:1.5; color:#333;">
-                    """
-                    for info in showtime_infos:
-                        hour = escape(info["showtime_hour"])
-                        t_name = escape(info["theater_name"])
-                        t_maps = escape(info["theater_maps"])
-                        html += f"""\
-                        <li style="margin:0 0 6px 0;">
-                            {hour} :
-                            <a href="{t_maps}" target="_blank" style="color:#1a73e8; text-decoration:none;">
-                            Cinéma {t_name}
-                            </a>
-                        </li>
-                        """
-                    html += "</ul></div>"
-
-                html += """\
-                    </td>
-                </tr>
-                </table>
-                """
-
-            # Missing movies card
-            if missing_allocine:
-                html += """\
-                <div style="background:#fff3cd; border:1px solid #ffeeba; color:#654d03;
-                            border-radius:8px; padding:16px; margin:28px 0; font-family:Arial,Helvetica,sans-serif;">
-                <div style="font-weight:700; font-size:18px; margin-bottom:8px;">
-                    Info non trouvée via Allociné
-                </div>
-                <div style="font-size:14px; margin-bottom:8px;">
-                    Erreur pour faire le pont entre Letterboxd et Allociné pour ces films :
-                </div>
-                <ul style="margin:0 0 0 18px; padding:0; font-size:14px; line-height:1.5;">
-                """
-                for missing_movie in missing_allocine:
-                    html += f"""\
-                    <li>
-                    <a href="{escape(missing_movie['lb_url'])}" target="_blank" style="color:#1a73e8; text-decoration:underline;">
-                        {escape(missing_movie['lb_title'])}
-                    </a>
-                    </li>
-                    """
-                html += """\
-                </ul>
-                </div>
-                """
-
-            html += """\
-                </div>
-                </body>
-            </html>
-            """
+            with metrics.stage("render"):
+                cards, missing_allocine = programme_cards(watchlist_movies, all_films_showtimes, all_films_showtimes_by_day, allocine_films)
+                if EMAIL_PLAIN_TEXT:
+                    message.attach(MIMEText(render_programme_text(cards, missing_allocine, theater_registry), "plain"))
+                html = render_programme_html(cards, missing_allocine, theater_registry)
             
             corps_mail = MIMEText(html, "html")
             message.attach(corps_mail)
-            
-            with smtplib.SMTP_SSL("smtp.gmail.com", port=EMAIL_PORT, context=context) as server:
-                server.login(user=EMAIL_SENDER, password=EMAIL_PWD)
-                server.sendmail(from_addr=EMAIL_SENDER, to_addrs=user_email, msg=message.as_string())
+            mailer.add(user_email, message)
 
         else:
             print("Aucun film de votre watchlist n'est programmé au cinéma actuellement !")
-    
+
     except Exception as e:
         print(f"[ERROR][{user.get('lb_profile_id','?')}] {e}")
-        continue
+        return str(e)
+    return None
+
+
+def select_users(users: list[dict], only_user: str = None) -> list[dict]:
+    """Users matching only_user (Letterboxd profile or email address), all users without it
+    
+    """
+    return [
+        user for user in users
+        if not only_user or only_user in (user.get("lb_profile_id"), user.get("email_address"))
+    ]
+
+def run(users: list[dict]) -> dict[str, str | None]:
+    """One pass over users: programmes scraped and emailed, caches saved and run report written.
+       Sessions, caches and indexes stay loaded between runs; runs never overlap.
+       Returns the error of each user {lb_profile_id: scraping or sending error, None if none}.
+    """
+    global metrics
+    with run_lock:
+        ## Fresh run metrics, HTTP session and caches are kept, expired showtimes dropped
+        metrics = RunMetrics("main")
+        for adapter in session.adapters.values():
+            adapter.metrics = metrics
+        showtimes_cache.prune()
+        showtimes_cache_start = (showtimes_cache.hits, showtimes_cache.misses)
+        http_cache_start = (http_cache.hits, http_cache.revalidated, http_cache.misses)
+
+        ### --- Scraping watchlist movies showtimes ---
+        print("Scraping watchlist movies showtimes...")
+        with ThreadPoolExecutor(max_workers=USERS_MAX_WORKERS) as executor:
+            scraping_errors = list(executor.map(process_user, users))
+        dump_json(letterboxd_films, LETTERBOXD_FILMS_CACHE_PATH)
+        dump_json(lb_to_ac_mapping, LB_TO_AC_MAPPING_PATH)
+        theater_registry.dump(THEATERS_PATH)
+
+        ### --- Send emails ---
+        print("Sending emails...")
+        with metrics.stage("send"):
+            send_errors = {}
+        for user_email, error in mailer.send_all():
+            if error:
+                print(f"[ERROR][{user_email}] {error}")
+                send_errors[user_email] = error
+
+        ### --- Run summary ---
+        print(showtimes_cache.stats())
+        print(http_cache.stats())
+        metrics.set_counters("showtimes_cache", {
+            name: count - start
+            for name, count, start in zip(["hits", "misses"], (showtimes_cache.hits, showtimes_cache.misses), showtimes_cache_start)
+        })
+        metrics.set_counters("http_cache", {
+            name: count - start
+            for name, count, start in zip(["hits", "revalidated", "misses"], (http_cache.hits, http_cache.revalidated, http_cache.misses), http_cache_start)
+        })
+        print(metrics.summary())
+        print(f"Run report: {metrics.write(RUN_REPORTS_PATH)}")
+        return {
+            user['lb_profile_id']: scraping_error or send_errors.get(user['email_address'])
+            for user, scraping_error in zip(users, scraping_errors)
+        }
+
+
+### --- One-shot run ---
+if __name__ == "__main__":
+    ONLY_USER = os.getenv("ONLY_USER")
+    run(select_users(load_users(), ONLY_USER))
@@ -0,0 +1,58 @@
+### --- Imports ---
+from datetime import datetime, timedelta
+
+from utils import find_closest_match
+
+
+### --- Parameters ---
+MAPPING_RETRY_DAYS = 2
+MAPPING_RETRY_MAX_DAYS = 30
+
+
+### --- Functions ---
+def needs_resolution(slug: str, mapping: dict, overrides: dict, now: datetime) -> bool:
+    """True for slugs never resolved, and for misses whose retry date has come
+
+    """
+    if slug in overrides:
+        return False
+    record = mapping.get(slug)
+    if record is None:
+        return True
+    return not record["ac_id"] and record["retry_at"] <= now.isoformat(timespec="seconds")
+
+def resolve_slugs(films: dict, title_index: dict, mapping: dict, overrides: dict, now: datetime = None) -> int:
+    """Resolves Letterboxd films {slug: {lb_title, lb_year, lb_original_title}} to Allocine ids in one batch.
+       Only slugs needing resolution are matched, identical (title, year) requests once;
+       mapping {slug: {ac_id, score, resolved_at, attempts, retry_at}} is updated in place.
+       Misses are retried after MAPPING_RETRY_DAYS, doubled at each new miss.
+       Returns the number of slugs matched.
+    """
+    now = now or datetime.now()
+    title_requests = {}
+    for slug, film in films.items():
+        if needs_resolution(slug, mapping, overrides, now):
+            title_request = film.get("lb_original_title") or film.get("lb_title")
+            title_requests.setdefault((title_request, film.get("lb_year")), []).append(slug)
+
+    for (title_request, year), slugs in title_requests.items():
+        ac_id, score = find_closest_match(title_request, title_index, year)
+        for slug in slugs:
+            attempts = 0 if ac_id else mapping.get(slug, {}).get("attempts", 0) + 1
+            retry_days = min(MAPPING_RETRY_DAYS * 2 ** max(attempts - 1, 0), MAPPING_RETRY_MAX_DAYS)
+            mapping[slug] = {
+                "ac_id": ac_id,
+                "score": round(score, 3),
+                "resolved_at": now.isoformat(timespec="seconds"),
+                "attempts": attempts,
+                "retry_at": None if ac_id else (now + timedelta(days=retry_days)).isoformat(timespec="seconds"),
+            }
+    return sum(len(slugs) for slugs in title_requests.values())
+
+def get_ac_id(slug: str, mapping: dict, overrides: dict) -> str | None:
+    """Allocine id of a Letterboxd slug, manual overrides first
+
+    """
+    if slug in overrides:
+        return overrides[slug]
+    return mapping.get(slug, {}).get("ac_id")
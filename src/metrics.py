@@ -0,0 +1,151 @@
+### --- Imports ---
+import csv
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+
+### --- Classes ---
+class RunMetrics:
+    """Stage timings and per-host request statistics of a run, shared between threads.
+       Stage times are summed over threads (busy time), to be compared with the run's wall time;
+       per host, time spent waiting for the rate limiter (sleeping) is kept apart from request time.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now()
+        self._start = time.monotonic()
+        self.stages = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        self.hosts = defaultdict(lambda: {
+            "requests": 0, "from_cache": 0, "errors": 0, "retries": 0, "throttled": 0,
+            "request_seconds": 0.0, "max_request_seconds": 0.0, "waited_seconds": 0.0,
+        })
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times the enclosed block as one call of stage name
+
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.monotonic() - start)
+
+    def add_stage_time(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name]["calls"] += 1
+            self.stages[name]["seconds"] += seconds
+
+    def timed(self, name: str, func):
+        """func, with each call timed as stage name
+
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def timed_iter(self, name: str, iterable):
+        """Yields iterable's items, timing the wait for each one as stage name
+
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.monotonic()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_stage_time(name, time.monotonic() - start)
+            yield item
+
+    def record_request(self, url: str, status_code: int | None, seconds: float = 0.0, waited: float = 0.0,
+                       retries: int = 0, throttled: int = 0, from_cache: bool = False):
+        """Records one request to url's host: final status, time on the wire (retries included),
+           time waited for the rate limiter, number of retries and of 429 responses among them
+        """
+        host = urllib.parse.urlsplit(url).hostname
+        with self._lock:
+            stats = self.hosts[host]
+            if from_cache:
+                stats["from_cache"] += 1
+                return
+            stats["requests"] += 1
+            stats["errors"] += status_code is None or status_code >= 400
+            stats["retries"] += retries
+            stats["throttled"] += throttled
+            stats["request_seconds"] += seconds
+            stats["max_request_seconds"] = max(stats["max_request_seconds"], seconds)
+            stats["waited_seconds"] += waited
+
+    def set_counters(self, name: str, counters: dict):
+        """Records counters of another component, e.g. cache hits and misses
+
+        """
+        with self._lock:
+            self.counters[name] = dict(counters)
+
+    def report(self) -> dict:
+        """Run report: wall time, stages, hosts (with mean request time) and counters
+
+        """
+        with self._lock:
+            hosts = {}
+            for host, stats in self.hosts.items():
+                hosts[host] = dict(stats)
+                hosts[host]["mean_request_seconds"] = stats["request_seconds"] / stats["requests"] if stats["requests"] else 0.0
+            return {
+                "run": self.name,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": time.monotonic() - self._start,
+                "stages": {name: dict(stats) for name, stats in self.stages.items()},
+                "hosts": hosts,
+                "counters": dict(self.counters),
+            }
+
+    def write(self, directory: str) -> str:
+        """Writes the run report as JSON, and flattened as (section, name, metric, value) CSV rows.
+           Returns the path of the JSON report.
+        """
+        report = self.report()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}_{self.started_at.strftime('%Y-%m-%d_%H%M%S')}")
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(path + ".csv", "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["section", "name", "metric", "value"])
+            writer.writerow(["run", self.name, "wall_seconds", round(report["wall_seconds"], 3)])
+            for section in ["stages", "hosts", "counters"]:
+                for name, stats in report[section].items():
+                    for metric, value in stats.items():
+                        writer.writerow([section, name, metric, round(value, 3) if isinstance(value, float) else value])
+        return path + ".json"
+
+    def summary(self) -> str:
+        """One line per stage and host, for the end of run log
+
+        """
+        report = self.report()
+        lines = [f"Run {self.name}: {report['wall_seconds']:.1f}s"]
+        for name, stats in report["stages"].items():
+            lines.append(f"  {name:<12}{stats['seconds']:>9.1f}s busy over {stats['calls']} calls")
+        for host, stats in report["hosts"].items():
+            lines.append(
+                f"  {host:<24}{stats['requests']:>6} requests, {stats['from_cache']} from cache, "
+                f"{stats['retries']} retries, {stats['throttled']} x 429, "
+                f"{stats['mean_request_seconds'] * 1000:.0f}ms mean, {stats['waited_seconds']:.1f}s rate limited"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,121 @@
+### --- Imports ---
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+from utils import URL_ALLOCINE
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+### --- Parameters ---
+# Only these subtrees are parsed, the rest of each page is skipped
+STRAINER_PAGINATION = SoupStrainer("div", class_="paginate-pages")
+STRAINER_WATCHLIST = SoupStrainer("li", class_="poster-container")
+STRAINER_FILM_DETAILS = SoupStrainer("div", class_="details")
+STRAINER_CATALOGUE = SoupStrainer("li", class_="mdl")
+
+
+### --- Functions ---
+def make_soup(markup: str | bytes, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """Parses markup with lxml when installed (html.parser otherwise), restricted to parse_only
+    
+    """
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=parse_only)
+
+def parse_watchlist_nb_pages(markup: str | bytes) -> int:
+    """Number of pages of a Letterboxd watchlist, from its first page
+    
+    """
+    soup = make_soup(markup, STRAINER_PAGINATION)
+    div_pages = soup.find("div", class_="paginate-pages")
+    if div_pages:
+        return int(div_pages.find_all("a")[-1].get_text())
+    return 1
+
+def parse_watchlist_slugs(markup: str | bytes) -> list[str]:
+    """Film slugs of a Letterboxd watchlist page, posters without a film slug being skipped
+    
+    """
+    soup = make_soup(markup, STRAINER_WATCHLIST)
+    div_movies = soup.find_all("li", class_="poster-container")
+    slugs = []
+    for mov in div_movies:
+        div_poster = mov.find("div")
+        slug = div_poster.get("data-film-slug") if div_poster else None
+        if slug:
+            slugs.append(slug)
+    return slugs
+
+def parse_film_details(markup: str | bytes) -> dict:
+    """Title, original title if available and year of a Letterboxd film page
+    
+    """
+    soup = make_soup(markup, STRAINER_FILM_DETAILS)
+    div_details = soup.find("div", class_="details")
+    # titles
+    movie_title = div_details.find("h1", class_="headline-1").find('span').get_text()
+    original_bool = div_details.find("h2", class_="originalname")
+    movie_original_title = original_bool.find("em").get_text() if original_bool else None
+    # year
+    release_date = div_details.find('span', class_="releasedate")
+    movie_year = release_date.get_text().strip() if release_date else None
+    return {
+        "lb_title": movie_title,
+        "lb_year": movie_year,
+        "lb_original_title": movie_original_title,
+    }
+
+def parse_films_page(markup: str | bytes) -> dict:
+    """Retrieves film info of an Allocine films page: {film_id: film}
+
+    """
+    soup = make_soup(markup, STRAINER_CATALOGUE)
+    page_films = soup.find_all("li", class_="mdl")
+
+    films = {}
+    for film in page_films:
+
+        # title, url and id
+        a_tag = film.find("a", class_="meta-title-link")
+        if not a_tag:
+            continue
+        film_title = a_tag.get_text(strip=True)
+        film_url = URL_ALLOCINE + a_tag["href"]
+        film_id = re.search(r'\d+', film_url).group()
+
+        # poster
+        img_tag = film.find("img", class_="thumbnail-img")
+        film_poster = None
+        if img_tag:
+            film_poster = img_tag.get("data-src") or img_tag.get("src")
+
+        # year
+        year = None
+        info_year_div = film.find("div", class_="meta-body-item meta-body-info")
+        if info_year_div:
+            info_year_text = info_year_div.get_text(" ", strip=True)
+            year_match = re.search(r"\b(19|20)\d{2}\b", info_year_text)
+            if year_match:
+                year = year_match.group()
+
+        # original title
+        original_title = None
+        info_orig_span = film.find("span", string=lambda t: t and t.strip() == "Titre original")
+        if info_orig_span:
+            info_orig_text = info_orig_span.find_next_sibling("span")
+            if info_orig_text:
+                original_title = info_orig_text.get_text(strip=True)
+
+        # Append movie to films dict
+        films[film_id] = {
+            "ac_title": film_title,
+            "ac_url": film_url,
+            "ac_poster": film_poster,
+            "ac_year": year,
+            "ac_original_title": original_title,
+        }
+    return films
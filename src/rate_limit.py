@@ -0,0 +1,66 @@
+### --- Imports ---
+import threading
+import time
+import urllib.parse
+
+
+### --- Classes ---
+class RateLimiter:
+    """Adaptive per-host rate limiter shared between threads.
+       Each host gets evenly spaced request slots at its current rate (requests per second):
+       the rate grows back towards the host's ceiling while responses are successful,
+       and is halved on 429, the host being paused for its Retry-After delay if given.
+    """
+
+    def __init__(self, rates: dict[str, float], default_rate: float = 1.0, start_ratio: float = 0.5,
+                 min_ratio: float = 0.05, increase_ratio: float = 0.05):
+        self.ceilings = rates
+        self.default_rate = default_rate
+        self.start_ratio = start_ratio
+        self.min_ratio = min_ratio
+        self.increase_ratio = increase_ratio
+        self._rates = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def ceiling(self, host: str) -> float:
+        """Maximum rate of host
+
+        """
+        return self.ceilings.get(host, self.default_rate)
+
+    def rate(self, host: str) -> float:
+        """Current rate of host
+
+        """
+        return self._rates.get(host, self.ceiling(host) * self.start_ratio)
+
+    def acquire(self, url: str) -> float:
+        """Blocks until a request to url's host is allowed, returns the time waited
+
+        """
+        host = urllib.parse.urlsplit(url).hostname
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1 / self.rate(host)
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def feedback(self, url: str, status_code: int, retry_after: float = None):
+        """Adapts url's host rate to a response status: additive increase on success,
+           multiplicative decrease on 429 and pause for retry_after seconds
+        """
+        host = urllib.parse.urlsplit(url).hostname
+        ceiling = self.ceiling(host)
+        with self._lock:
+            rate = self.rate(host)
+            if status_code == 429:
+                self._rates[host] = max(ceiling * self.min_ratio, rate / 2)
+                if retry_after:
+                    now = time.monotonic()
+                    self._next_slot[host] = max(self._next_slot.get(host, now), now + retry_after)
+            elif 200 <= status_code < 400:
+                self._rates[host] = min(ceiling, rate + ceiling * self.increase_ratio)
@@ -0,0 +1,174 @@
+### --- Imports ---
+from functools import lru_cache
+from html import escape
+
+from theaters import TheaterRegistry
+
+
+### --- Parameters ---
+MISSING_TITLE = "Titre inconnu"
+MISSING_POSTER = "https://via.placeholder.com/120x180?text=No+Poster"
+
+# HTML email templates, filled with escaped values
+HTML_HEAD = """\
+            <html>
+                <head>
+                <meta name="viewport" content="width=device-width, initial-scale=1">        
+                </head>
+                <body>
+                    <div class="container">
+            """
+HTML_FILM_CARD = """\
+                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0"
+                    style="margin-bottom:30px; background:#ffffff; border:1px solid #ddd; border-radius:10px; overflow:hidden;">
+                <tr>
+                    <!-- colonne affiche -->
+                    <td width="120" valign="top" style="padding:12px;">
+                    <img src="{film_poster}" alt="Affiche de {film_name}" width="120" height="180"
+                        style="display:block; width:120px; height:180px; border-radius:6px; border:0; outline:none;">
+                    </td>
+
+                    <!-- colonne texte -->
+                    <td valign="top" style="padding:12px 16px; font-family:Arial,Helvetica,sans-serif;">
+                    <h2 style="margin:0 0 8px 0; font-size:20px; font-weight:bold; color:#EF0107;">
+                        {film_name}
+                    </h2>
+                """
+HTML_DAY = """\
+                    <div style="margin:10px 0;">
+                        <div style="background:#f9f2dc; color:#9C824A; font-size:15px; font-weight:bold;
+                                    padding:6px 10px; border-radius:4px; display:inline-block; margin-bottom:6px;">
+                        {showtime_day}
+                        </div>
+                        <ul style="margin:0; padding-left:20px; font-size:14px; line-height:1.5; color:#333;">
+                    """
+HTML_SHOWTIME = """\
+                        <li style="margin:0 0 6px 0;">
+                            {showtime_hour} :
+                            <a href="{theater_maps}" target="_blank" style="color:#1a73e8; text-decoration:none;">
+                            Cinéma {theater_name}
+                            </a>
+                        </li>
+                        """
+HTML_DAY_END = "</ul></div>"
+HTML_FILM_CARD_END = """\
+                    </td>
+                </tr>
+                </table>
+                """
+HTML_MISSING_HEAD = """\
+                <div style="background:#fff3cd; border:1px solid #ffeeba; color:#654d03;
+                            border-radius:8px; padding:16px; margin:28px 0; font-family:Arial,Helvetica,sans-serif;">
+                <div style="font-weight:700; font-size:18px; margin-bottom:8px;">
+                    Info non trouvée via Allociné
+                </div>
+                <div style="font-size:14px; margin-bottom:8px;">
+                    Erreur pour faire le pont entre Letterboxd et Allociné pour ces films :
+                </div>
+                <ul style="margin:0 0 0 18px; padding:0; font-size:14px; line-height:1.5;">
+                """
+HTML_MISSING_FILM = """\
+                    <li>
+                    <a href="{lb_url}" target="_blank" style="color:#1a73e8; text-decoration:underline;">
+                        {lb_title}
+                    </a>
+                    </li>
+                    """
+HTML_MISSING_END = """\
+                </ul>
+                </div>
+                """
+HTML_TAIL = """\
+                </div>
+                </body>
+            </html>
+            """
+
+
+### --- Functions ---
+escape_cached = lru_cache(maxsize=None)(escape)
+
+def programme_cards(watchlist_movies: dict, all_films_showtimes: dict, all_films_showtimes_by_day: dict, allocine_films) -> tuple[list[dict], list[dict]]:
+    """Films to show in the email, and films missing from Allocine: (cards, missing_allocine)
+    
+    """
+    cards = []
+    missing_allocine = []
+    for lb_id, film_showtimes in all_films_showtimes_by_day.items():
+        ac_id = (all_films_showtimes.get(lb_id) or {}).get("ac_id")
+        if not film_showtimes:
+            # no showtime, checking if ac_id problem
+            if not ac_id:
+                missing_allocine.append({
+                    "lb_title": watchlist_movies[lb_id]["lb_title"],
+                    "lb_url": watchlist_movies[lb_id]["lb_url"],
+                })
+            continue
+
+        film = allocine_films.get(ac_id) if ac_id else None
+        if not film:
+            # no ac_id: add to missing_allocine to alert user
+            missing_allocine.append({
+                "lb_title": watchlist_movies[lb_id]["lb_title"],
+                "lb_url": watchlist_movies[lb_id]["lb_url"],
+            })
+            continue
+
+        cards.append({
+            "film_name": film.get("ac_title") or MISSING_TITLE,
+            "film_poster": film.get("ac_poster") or MISSING_POSTER,
+            "showtimes_by_day": film_showtimes,
+        })
+    return cards, missing_allocine
+
+def render_programme_html(cards: list[dict], missing_allocine: list[dict], theaters: TheaterRegistry) -> str:
+    """HTML email body of a programme, built in one join, theaters being resolved in the theater registry
+    
+    """
+    parts = [HTML_HEAD]
+    for card in cards:
+        film_name = escape_cached(card["film_name"])
+        parts.append(HTML_FILM_CARD.format(film_poster=escape_cached(card["film_poster"]), film_name=film_name))
+        for showtime_day, showtime_infos in card["showtimes_by_day"].items():
+            parts.append(HTML_DAY.format(showtime_day=escape_cached(str(showtime_day))))
+            parts.extend(
+                HTML_SHOWTIME.format(
+                    showtime_hour=escape_cached(info["showtime_hour"]),
+                    theater_name=escape_cached(theaters[info["theater_id"]]["name"]),
+                    theater_maps=escape_cached(theaters[info["theater_id"]]["maps"]),
+                )
+                for info in showtime_infos
+            )
+            parts.append(HTML_DAY_END)
+        parts.append(HTML_FILM_CARD_END)
+
+    if missing_allocine:
+        parts.append(HTML_MISSING_HEAD)
+        parts.extend(
+            HTML_MISSING_FILM.format(lb_url=escape_cached(missing_movie["lb_url"]), lb_title=escape_cached(missing_movie["lb_title"]))
+            for missing_movie in missing_allocine
+        )
+        parts.append(HTML_MISSING_END)
+
+    parts.append(HTML_TAIL)
+    return "".join(parts)
+
+def render_programme_text(cards: list[dict], missing_allocine: list[dict], theaters: TheaterRegistry) -> str:
+    """Plain text email body of a programme
+    
+    """
+    lines = []
+    for card in cards:
+        lines.append(card["film_name"])
+        for showtime_day, showtime_infos in card["showtimes_by_day"].items():
+            lines.append(f"  {showtime_day}")
+            lines.extend(
+                f"    {info['showtime_hour']} : Cinéma {theaters[info['theater_id']]['name']} ({theaters[info['theater_id']]['maps']})"
+                for info in showtime_infos
+            )
+        lines.append("")
+
+    if missing_allocine:
+        lines.append("Info non trouvée via Allociné, erreur pour faire le pont entre Letterboxd et Allociné pour ces films :")
+        lines.extend(f"  {missing_movie['lb_title']} ({missing_movie['lb_url']})" for missing_movie in missing_allocine)
+    return "\n".join(lines)
@@ -1,94 +1,182 @@
 ### --- Imports ---
 print("Imports...")
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
-import time
-import re
+import os
 import urllib
-
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from catalogue import write_catalogue_db, write_title_index
+from http_client import create_session
+from metrics import RunMetrics
+from parsing import parse_films_page
+from rate_limit import RateLimiter
+from utils import dump_json
 from utils import (
     URL_ALLOCINE,
-    ALLOCINE_FILMS_PATH
+    ALLOCINE_FILMS_PATH,
+    ALLOCINE_FILMS_DB_PATH,
+    ALLOCINE_FILMS_CHECKPOINT_PATH,
+    ALLOCINE_TITLE_INDEX_PATH,
+    RATE_LIMITS,
+    RUN_REPORTS_PATH,
 )
 
 
-### --- Settings scraping ---
-session = requests.Session()
-session.headers.update({
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
-    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-})
-
-
 ### --- Parameters ---
 print("Parameters...")
+parser = argparse.ArgumentParser(description="Scrapes the Allocine films catalogue")
+parser.add_argument("--incremental", action="store_true",
+                    help="refresh the existing catalogue from its first pages only")
+parser.add_argument("--stop-after", type=int, default=5,
+                    help="incremental mode: stop after this many consecutive pages without new film")
+args = parser.parse_args()
+
 pages_total = 5000
+pages_per_chunk = 50
+max_workers = 8
 
 
-### --- Scraping Allocine films ---
-print("Scraping Allocine films...")
-start = time.time()
+### --- Settings scraping ---
+metrics = RunMetrics("scraping_all_films")
+limiter = RateLimiter(RATE_LIMITS)
+session = create_session(limiter, pool_maxsize=max_workers, metrics=metrics)
+
 
-all_films = {}
-for page_num in range(1, pages_total):
-    if page_num % 100 == 0:
-        print(page_num)
+### --- Functions ---
+def fetch_films_page(page_num: int) -> dict:
+    """Retrieves film info of Allocine films page page_num, empty past the last page
 
-    # Retrieve page films
+    """
     link_page = f"films/?page={page_num}"
     url = urllib.parse.urljoin(URL_ALLOCINE, link_page)
     resp = session.get(url)
+    if resp.status_code == 404:
+        return {}
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    page_films = soup.find_all("li", class_="mdl")
-
-    # Retrieve film info for page films
-    for film in page_films:
-
-        # title, url and id
-        a_tag = film.find("a", class_="meta-title-link")
-        if not a_tag:
-            continue
-        film_title = a_tag.get_text(strip=True)
-        film_url = URL_ALLOCINE + a_tag["href"]
-        film_id = re.search(r'\d+', film_url).group()
-
-        # poster
-        img_tag = film.find("img", class_="thumbnail-img")
-        film_poster = None
-        if img_tag:
-            film_poster = img_tag.get("data-src") or img_tag.get("src")
-        
-        # year
-        year = None
-        info_year_div = film.find("div", class_="meta-body-item meta-body-info")
-        if info_year_div:
-            info_year_text = info_year_div.get_text(" ", strip=True)
-            year_match = re.search(r"\b(19|20)\d{2}\b", info_year_text)
-            if year_match:
-                year = year_match.group()
-
-        # original title
-        original_title = None
-        info_orig_span = film.find("span", string=lambda t: t and t.strip() == "Titre original")
-        if info_orig_span:
-            info_orig_text = info_orig_span.find_next_sibling("span")
-            if info_orig_text:
-                original_title = info_orig_text.get_text(strip=True)
-
-        # Append movie to films dict
-        all_films[film_id] = {
-            "ac_title": film_title,
-            "ac_url": film_url,
-            "ac_poster": film_poster,
-            "ac_year": year,
-            "ac_original_title": original_title,
-        }
-
-# Exporting Allocine films
-with open(ALLOCINE_FILMS_PATH, "w", encoding="utf-8") as f:
-    json.dump(all_films, f, ensure_ascii=False, indent=2)
-
-print(time.time() - start)
+    with metrics.stage("parse"):
+        return parse_films_page(resp.text)
+
+def checkpoint_path(first_page: int, last_page: int) -> str:
+    """Checkpoint file of a pages range
+
+    """
+    return os.path.join(ALLOCINE_FILMS_CHECKPOINT_PATH, f"pages_{first_page:05d}_{last_page:05d}.json")
+
+def crawl_pages_range(first_page: int, last_page: int) -> dict:
+    """Crawls pages first_page to last_page (excluded) and checkpoints them to disk.
+       Stops at the first empty page, flagged as the end of the catalogue.
+    """
+    films = {}
+    end_reached = False
+    for page_num in range(first_page, last_page):
+        page_films = fetch_films_page(page_num)
+        if not page_films:
+            end_reached = True
+            break
+        films.update(page_films)
+    chunk = {"films": films, "end_reached": end_reached}
+    dump_json(chunk, checkpoint_path(first_page, last_page), indent=None)
+    return chunk
+
+def end_page(chunks: dict) -> int:
+    """First page of the pages range known to reach the end of the catalogue
+
+    """
+    return min((first_page for first_page, chunk in chunks.items() if chunk["end_reached"]), default=pages_total)
+
+def crawl_full() -> dict:
+    """Crawls the whole catalogue with a worker pool, resuming from checkpointed pages ranges
+
+    """
+    # Pages ranges, already crawled ones are loaded from checkpoints
+    pages_ranges = [
+        (first_page, min(first_page + pages_per_chunk, pages_total))
+        for first_page in range(1, pages_total, pages_per_chunk)
+    ]
+    chunks = {}
+    for first_page, last_page in pages_ranges:
+        path = checkpoint_path(first_page, last_page)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                chunks[first_page] = json.load(f)
+    if chunks:
+        print(f"Resuming from {len(chunks)} checkpointed pages ranges")
+
+    # Crawling pages ranges with a worker pool, no new range past the end of the catalogue
+    todo = [pages_range for pages_range in pages_ranges if pages_range[0] not in chunks]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while todo or running:
+            while todo and len(running) < max_workers and todo[0][0] <= end_page(chunks):
+                first_page, last_page = todo.pop(0)
+                running[executor.submit(crawl_pages_range, first_page, last_page)] = first_page
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                first_page = running.pop(future)
+                chunks[first_page] = future.result()
+                print(f"Pages {first_page}+ done ({len(chunks[first_page]['films'])} films)")
+
+    # Merging pages ranges in pages order
+    all_films = {}
+    for first_page in sorted(chunks):
+        if first_page > end_page(chunks):
+            break
+        all_films.update(chunks[first_page]["films"])
+
+    # Removing checkpoints
+    for first_page, last_page in pages_ranges:
+        path = checkpoint_path(first_page, last_page)
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.isdir(ALLOCINE_FILMS_CHECKPOINT_PATH) and not os.listdir(ALLOCINE_FILMS_CHECKPOINT_PATH):
+        os.rmdir(ALLOCINE_FILMS_CHECKPOINT_PATH)
+    return all_films
+
+def crawl_incremental(all_films: dict, stop_after: int) -> dict:
+    """Crawls the catalogue from its first pages, merging new and changed films into all_films.
+       Stops after stop_after consecutive pages without any new film_id.
+    """
+    pages_without_new = 0
+    page_num = 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while page_num < pages_total and pages_without_new < stop_after:
+            window = range(page_num, min(page_num + max_workers, pages_total))
+            for page_num, page_films in zip(window, executor.map(fetch_films_page, window)):
+                if not page_films:
+                    return all_films
+                new_ids = page_films.keys() - all_films.keys()
+                changed_ids = [film_id for film_id, film in page_films.items() if all_films.get(film_id, film) != film]
+                print(f"Page {page_num}: {len(new_ids)} new, {len(changed_ids)} changed")
+                all_films.update(page_films)
+                pages_without_new = 0 if new_ids else pages_without_new + 1
+                if pages_without_new >= stop_after:
+                    break
+            page_num += 1
+    return all_films
+
+
+### --- Scraping Allocine films ---
+print("Scraping Allocine films...")
+
+with metrics.stage("crawl"):
+    if args.incremental and os.path.exists(ALLOCINE_FILMS_PATH):
+        with open(ALLOCINE_FILMS_PATH, "r", encoding="utf-8") as f:
+            all_films = json.load(f)
+        nb_films = len(all_films)
+        all_films = crawl_incremental(all_films, args.stop_after)
+        print(f"{len(all_films) - nb_films} new films")
+    else:
+        all_films = crawl_full()
+
+# Exporting Allocine films: SQLite store and title index read by main.py, JSON export for compatibility
+with metrics.stage("export"):
+    write_catalogue_db(all_films, ALLOCINE_FILMS_DB_PATH)
+    write_title_index(all_films, ALLOCINE_TITLE_INDEX_PATH)
+    dump_json(all_films, ALLOCINE_FILMS_PATH)
+
+metrics.set_counters("catalogue", {"films": len(all_films)})
+print(metrics.summary())
+print(f"Run report: {metrics.write(RUN_REPORTS_PATH)}")
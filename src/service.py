@@ -0,0 +1,181 @@
+### --- Imports ---
+import argparse
+import json
+import queue
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from utils import dump_json, load_json
+from utils import (
+    SERVICE_INTERVAL_HOURS,
+    SERVICE_PORT,
+    SERVICE_STATE_PATH,
+)
+
+
+### --- Classes ---
+class Scheduler:
+    """Refreshes each user every interval, first runs being staggered over the interval,
+       one user at a time on a worker thread reusing main.py's warm sessions, caches and indexes.
+       Users can also be queued on demand. Last runs are persisted, a restart keeps the schedule.
+    """
+
+    def __init__(self, interval: timedelta, state_path: str = SERVICE_STATE_PATH, schedule: bool = True):
+        self.interval = interval
+        self.state_path = state_path
+        self.schedule = schedule
+        self.started_at = datetime.now()
+        self.last_runs = load_json(state_path, default={})
+        self.running = None
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def next_runs(self, users: list[dict]) -> dict[str, datetime]:
+        """Next scheduled run of each user: interval after its last run, staggered from start otherwise
+
+        """
+        next_runs = {}
+        for i, user in enumerate(users):
+            user_id = user['lb_profile_id']
+            last_run = self.last_runs.get(user_id)
+            if last_run:
+                next_runs[user_id] = datetime.fromisoformat(last_run['at']) + self.interval
+            else:
+                next_runs[user_id] = self.started_at + self.interval * i / len(users)
+        return next_runs
+
+    def trigger(self, user_ids: list[str]) -> list[str]:
+        """Queues users for a run, returns those not already queued or running.
+           A running user is skipped: its last run is only recorded once the run ends.
+        """
+        queued = []
+        with self._lock:
+            for user_id in user_ids:
+                if user_id not in self._queued and user_id != self.running:
+                    self._queued.add(user_id)
+                    self._queue.put(user_id)
+                    queued.append(user_id)
+        return queued
+
+    def scheduler_loop(self):
+        """Queues users as their run comes due, checking again at least every minute
+
+        """
+        while True:
+            now = datetime.now()
+            next_runs = self.next_runs(main.load_users())
+            self.trigger([user_id for user_id, next_run in next_runs.items() if next_run <= now])
+            upcoming = [next_run for next_run in next_runs.values() if next_run > now]
+            timeout = (min(upcoming) - now).total_seconds() if upcoming else 60
+            self._wake.wait(min(max(timeout, 1), 60))
+            self._wake.clear()
+
+    def worker_loop(self):
+        """Runs queued users one at a time, reloading the catalogue when it was refreshed on disk
+
+        """
+        while True:
+            user_id = self._queue.get()
+            with self._lock:
+                self._queued.discard(user_id)
+                self.running = user_id
+            try:
+                if main.catalogue_modified_at() != main.catalogue_mtime:
+                    print("Catalogue refreshed on disk, reloading it...")
+                    main.load_catalogue()
+                users = main.select_users(main.load_users(), user_id)
+                errors = main.run(users)
+                last_run = {"at": datetime.now().isoformat(timespec="seconds"), "error": errors.get(user_id)}
+            except Exception as e:
+                print(f"[ERROR][{user_id}] {e}")
+                last_run = {"at": datetime.now().isoformat(timespec="seconds"), "error": str(e)}
+            with self._lock:
+                self.last_runs[user_id] = last_run
+                self.running = None
+                dump_json(self.last_runs, self.state_path)
+            self._wake.set()
+
+    def start(self):
+        threading.Thread(target=self.worker_loop, daemon=True).start()
+        if self.schedule:
+            threading.Thread(target=self.scheduler_loop, daemon=True).start()
+
+    def status(self) -> dict:
+        """Running and queued users, last and next run of each user
+
+        """
+        next_runs = self.next_runs(main.load_users()) if self.schedule else {}
+        with self._lock:
+            return {
+                "running": self.running,
+                "queued": sorted(self._queued),
+                "users": {
+                    user_id: {
+                        "last_run": self.last_runs.get(user_id),
+                        "next_run": next_runs[user_id].isoformat(timespec="seconds") if user_id in next_runs else None,
+                    }
+                    for user_id in [user['lb_profile_id'] for user in main.load_users()]
+                },
+            }
+
+
+### --- Functions ---
+def make_handler(scheduler: Scheduler):
+    """Local HTTP API of the service:
+       GET /status, POST /run (all users), POST /run/{lb_profile_id or email_address}
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def reply(self, status: int, data: dict):
+            body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/status":
+                self.reply(200, scheduler.status())
+            else:
+                self.reply(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            if parts[0] != "run" or len(parts) > 2:
+                self.reply(404, {"error": f"unknown path {self.path}"})
+                return
+            users = main.select_users(main.load_users(), parts[1] if len(parts) == 2 else None)
+            if not users:
+                self.reply(404, {"error": f"unknown user {parts[1]}"})
+                return
+            queued = scheduler.trigger([user['lb_profile_id'] for user in users])
+            self.reply(202, {"queued": queued})
+
+    return Handler
+
+
+### --- Running the service ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs main.py as a resident service, with a scheduler and a local HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--interval-hours", type=float, default=SERVICE_INTERVAL_HOURS,
+                        help="time between two runs of a user")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="only run users triggered through the API")
+    args = parser.parse_args()
+
+    scheduler = Scheduler(timedelta(hours=args.interval_hours), schedule=not args.no_schedule)
+    scheduler.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(scheduler))
+    print(f"Service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,122 @@
+### --- Imports ---
+import urllib.parse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from theaters import TheaterRegistry
+from utils import URL_ALLOCINE_SHOWTIMES
+
+
+### --- Parameters ---
+EVENING_MINUTES = 18 * 60
+WEEKEND_DAYS = {5, 6}
+
+
+### --- Functions ---
+def department_matcher(departments_subset: list[str]):
+    """Zip code filter on departments_subset, with precomputed prefixes
+    
+    """
+    prefixes = frozenset(departments_subset)
+    lengths = sorted({len(prefix) for prefix in prefixes})
+    return lambda zip_code: any(zip_code[:length] in prefixes for length in lengths)
+
+def format_theater_showtimes(theater_id: str, showtimes: dict) -> dict:
+    """Keeps the theater id and the showtimes of an Allocine showtimes result, theater info being in the registry
+    
+    """
+    return {
+        'theater_id': theater_id,
+        'theater_showtimes': [
+            (showtime['startsAt'], showtime['diffusionVersion'])
+            for version_showtimes in showtimes.values() for showtime in version_showtimes
+        ],
+    }
+
+def fetch_showtimes_payload(url: str, session) -> dict | None:
+    """Gets an Allocine showtimes day payload, None if the request failed
+    
+    """
+    res = session.get(url)
+    if res.status_code != 200:
+        print(f"[WARN] {res.status_code} lors du GET {url}")
+        return None
+    return res.json()
+
+def fetch_film_showtimes(film_id: str, city_id: str, departments_subset: list[str], session, date_start: str, date_max: str, theaters: TheaterRegistry, cache=None) -> list[dict]:
+    """Walks film showtimes near city day by day, from date_start to date_max.
+       Days without showtimes are skipped up to the nextDate given by Allocine.
+       Every theater met is registered in theaters.
+       With a cache, each (film_id, city_id, date) payload is requested once per run.
+    """
+    link_movie_near = f"movie-{film_id}/near-{city_id}/d-"
+    url_film = urllib.parse.urljoin(URL_ALLOCINE_SHOWTIMES, link_movie_near)
+    in_departments = department_matcher(departments_subset)
+    next_date = date_start
+    film_showtimes = []
+    while next_date and next_date <= date_max:
+        url_film_date = url_film + next_date
+        if cache:
+            payload = cache.get_or_fetch(
+                (film_id, city_id, next_date),
+                lambda: fetch_showtimes_payload(url_film_date, session),
+            )
+        else:
+            payload = fetch_showtimes_payload(url_film_date, session)
+        if payload is None:
+            break
+        results = payload['results']
+        if results:
+            for elem in results:
+                theater_id = theaters.add(elem['theater'])
+                if in_departments(theaters[theater_id]['zip']):
+                    film_showtimes.append(format_theater_showtimes(theater_id, elem['showtimes']))
+            next_date = (datetime.strptime(next_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        elif payload.get('nextDate') and payload['nextDate'] > next_date:
+            next_date = payload['nextDate']
+        else:
+            next_date = None
+    return film_showtimes
+
+@lru_cache(maxsize=None)
+def parse_showtime_date(showtime_date: str) -> tuple[int, int, str]:
+    """Date ordinal, weekday and day label ('Saturday 18 October 2026') of a showtime date, parsed once per date
+    
+    """
+    day_date = date(int(showtime_date[:4]), int(showtime_date[5:7]), int(showtime_date[8:10]))
+    return day_date.toordinal(), day_date.weekday(), day_date.strftime('%A %d %B %Y')
+
+def normalize_showtime(starts_at: str) -> tuple[int, int, int, str]:
+    """Compact showtime record from its startsAt timestamp: (date ordinal, minutes of day, weekday, day label)
+    
+    """
+    ordinal, weekday, day_label = parse_showtime_date(starts_at[:10])
+    return ordinal, int(starts_at[11:13]) * 60 + int(starts_at[14:16]), weekday, day_label
+
+def group_showtimes_by_day(film_showtimes: list[dict]) -> dict:
+    """Groups film showtimes by day label, keeping evening and weekend showtimes only
+    
+    """
+    daily_info = defaultdict(list)
+    for theater in film_showtimes:
+        theater_id = theater['theater_id']
+        for starts_at, _ in theater['theater_showtimes']:
+            _, minutes, weekday, day_label = normalize_showtime(starts_at)
+            if minutes >= EVENING_MINUTES or weekday in WEEKEND_DAYS:
+                daily_info[day_label].append(
+                    {
+                        'theater_id': theater_id,
+                        'showtime_hour': starts_at[11:16].replace(':', 'h'),
+                    }
+                )
+    return dict(daily_info)
+
+def fetch_film_programme(film_id: str | None, city_id: str, departments_subset: list[str], session, date_start: str, date_max: str, theaters: TheaterRegistry, cache=None) -> tuple[list[dict], dict]:
+    """Showtimes and day-grouped showtimes of a film, empty without film_id
+    
+    """
+    if not film_id:
+        return [], {}
+    film_showtimes = fetch_film_showtimes(film_id, city_id, departments_subset, session, date_start, date_max, theaters, cache)
+    return film_showtimes, group_showtimes_by_day(film_showtimes)
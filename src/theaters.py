@@ -0,0 +1,75 @@
+### --- Imports ---
+import threading
+
+from utils import (
+    dump_json,
+    google_maps_link,
+    load_json,
+)
+
+
+### --- Functions ---
+def department_of(zip_code: str) -> str:
+    """Department of a French zip code, 3 digits for overseas departments
+
+    """
+    return zip_code[:3] if zip_code.startswith("97") else zip_code[:2]
+
+def make_theater_record(theater: dict) -> dict:
+    """Registry record of an Allocine theater: normalized address, department, maps link and loyalty cards
+
+    """
+    location = theater['location']
+    address = " ".join(location['address'].split())
+    zip_code = location['zip'].strip()
+    city = " ".join(location['city'].split())
+    full_address = " ".join(part for part in [address, zip_code, city] if part)
+    return {
+        "name": theater['name'],
+        "address": address,
+        "zip": zip_code,
+        "city": city,
+        "full_address": full_address,
+        "department": department_of(zip_code),
+        "maps": google_maps_link(full_address),
+        "loyalty_cards": theater.get('loyaltyCards') or [],
+    }
+
+
+### --- Classes ---
+class TheaterRegistry:
+    """Allocine theaters met in showtimes responses, keyed by Allocine theater id.
+       Filled incrementally and shared between threads; a record is rebuilt when Allocine's data
+       for its theater changes. Showtimes records only keep theater ids, resolved here when rendering.
+    """
+
+    def __init__(self, theaters: dict = None):
+        self.theaters = theaters or {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "TheaterRegistry":
+        return cls(load_json(path, default={}).get("theaters"))
+
+    def dump(self, path: str):
+        with self._lock:
+            data = {"theaters": dict(self.theaters)}
+        dump_json(data, path)
+
+    def add(self, theater: dict) -> str:
+        """Registers an Allocine theater or refreshes its record, returns its id.
+           Records are only rebuilt for theater data not seen yet by this process.
+        """
+        theater_id = theater['internalId']
+        source = (theater['name'], theater['location'], theater.get('loyaltyCards'))
+        if self._sources.get(theater_id) == source:
+            return theater_id
+        record = make_theater_record(theater)
+        with self._lock:
+            self._sources[theater_id] = source
+            self.theaters[theater_id] = record
+        return theater_id
+
+    def __getitem__(self, theater_id: str) -> dict:
+        return self.theaters[theater_id]
@@ -1,7 +1,12 @@
 ### --- Imports ---
 import urllib
 import difflib
-from collections import defaultdict
+import heapq
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
 import requests
 
 
@@ -11,15 +16,49 @@ import requests
 URL_LETTERBOXD = "https://letterboxd.com/"
 URL_ALLOCINE = "https://www.allocine.fr"
 URL_ALLOCINE_SHOWTIMES = "https://www.allocine.fr/_/showtimes/"
+RATE_LIMITS = {
+    "letterboxd.com": float(os.getenv("RATE_LIMIT_LETTERBOXD", 1.0)),
+    "www.allocine.fr": float(os.getenv("RATE_LIMIT_ALLOCINE", 8.0)),
+}
+SHOWTIMES_MAX_WORKERS = 8
+LETTERBOXD_MAX_WORKERS = 4
+USERS_MAX_WORKERS = 4
 
 # Input / output parameters
 ALLOCINE_CITIES_PATH = "./data/input/allocine_cities_id.json"
 ALLOCINE_FILMS_PATH = "./data/input/allocine_films.json"
+ALLOCINE_FILMS_DB_PATH = "./data/input/allocine_films.sqlite"
+ALLOCINE_TITLE_INDEX_PATH = "./data/input/allocine_title_index.sqlite"
+ALLOCINE_FILMS_CHECKPOINT_PATH = "./data/input/allocine_films_checkpoint/"
 USERS_INFO_PATH = "./data/input/users_info.json"
 WATCHLIST_PATH = "./data/output/watchlist_films/"
 WATCHLIST_FILENAME = "_watchlist_films.json"
 PROGRAMME_PATH = "./data/output/cinema_programme/"
 PROGRAMME_FILENAME = "_programme.json"
+RUN_REPORTS_PATH = "./data/output/run_reports/"
+LETTERBOXD_FILMS_CACHE_PATH = "./data/cache/letterboxd_films.json"
+LB_TO_AC_MAPPING_PATH = "./data/cache/lb_to_ac_mapping.json"
+LB_TO_AC_OVERRIDES_PATH = "./data/input/lb_to_ac_overrides.json"
+SHOWTIMES_CACHE_PATH = "./data/cache/showtimes.sqlite"
+SHOWTIMES_CACHE_TTL = 6 * 3600
+THEATERS_PATH = "./data/cache/theaters.json"
+SERVICE_STATE_PATH = "./data/cache/service_state.json"
+
+# Service parameters
+SERVICE_PORT = 8765
+SERVICE_INTERVAL_HOURS = 84  # twice a week, as the weekly workflow's cron
+HTTP_CACHE_PATH = "./data/cache/http.sqlite"
+HTTP_CACHE_TTLS = [  # (url pattern, seconds served without revalidation), unmatched urls are not cached
+    (r"^https://letterboxd\.com/film/", 7 * 86400),
+    (r"^https://letterboxd\.com/[^/]+/watchlist/", 0),
+    (r"^https://www\.allocine\.fr/_/showtimes/", 3600),
+]
+
+# Matching parameters
+MATCH_YEAR_OFFSET = 5
+MATCH_NB_CLOSEST = 10
+MATCH_NB_CANDIDATES = 50
+TITLE_ARTICLES = {"the", "a", "an", "le", "la", "les", "l", "un", "une", "des"}
 
 
 
@@ -37,21 +76,93 @@ def build_index(films: dict) -> dict[str, list[str]]:
             title_to_id_year[candidate_title].append({'ac_id':film_id, 'ac_year':candidate_year})
     return title_to_id_year
 
-def find_closest_id(target: str, title_to_id_year: dict, year: str = None) -> str | None:
+def normalize_title(title: str) -> str:
+    """Normalizes a title for matching: accents, case, punctuation and leading article
+    
+    """
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    words = re.sub(r"[\W_]+", " ", title.lower()).split()
+    if len(words) > 1 and words[0] in TITLE_ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+def title_trigrams(title: str) -> set[str]:
+    """Character trigrams of a normalized title, padded with spaces
+    
+    """
+    padded = f" {title} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+def build_title_index(title_to_id_year: dict) -> dict:
+    """Creates the matching index of build_index titles, built once per run:
+       - titles: list of catalogue titles, referenced by position
+       - grams: {trigram: [title positions]}, trigram inverted index
+       - nb_grams: number of trigrams per title
+       - entries: title_to_id_year
+    """
+    titles = list(title_to_id_year.keys())
+    grams = defaultdict(list)
+    nb_grams = []
+    for position, title in enumerate(titles):
+        trigrams = title_trigrams(normalize_title(title))
+        nb_grams.append(len(trigrams))
+        for trigram in trigrams:
+            grams[trigram].append(position)
+    return {
+        'titles': titles,
+        'grams': dict(grams),
+        'nb_grams': nb_grams,
+        'entries': title_to_id_year,
+    }
+
+def find_closest_match(target: str, title_index: dict, year: str = None) -> tuple[str | None, float]:
+    """Finds closest movie to target, based on movie title, and filtered on movie year: (ac_id, score)
+       Same result as the full scan: the 10 closest titles of the whole catalogue, filtered on year.
+       Scores of the titles sharing the most trigrams with target give a difflib cutoff
+       that keeps the full scan's answer, most titles of the catalogue being skipped unscored.
+    """
+    titles = title_index['titles']
+    title_to_id_year = title_index['entries']
+    possible_years = [str(int(year) + offset) for offset in range(-MATCH_YEAR_OFFSET, MATCH_YEAR_OFFSET + 1)] if year else None
+    plausible = lambda title: [elem for elem in title_to_id_year[title] if not possible_years or elem['ac_year'] in possible_years]
+
+    # Candidates generation: trigram overlap (Dice coefficient) on normalized titles
+    target_grams = title_trigrams(normalize_title(target))
+    overlaps = Counter()
+    for trigram in target_grams:
+        overlaps.update(title_index['grams'].get(trigram, ()))
+    candidates = heapq.nlargest(
+        MATCH_NB_CANDIDATES,
+        overlaps,
+        key=lambda position: overlaps[position] / (len(target_grams) + title_index['nb_grams'][position]),
+    )
+
+    # Cutoff: the full scan's 10 closest titles score at least as much as the 10th best candidate,
+    # and the titles ranked above the closest plausible title at least as much as the best plausible candidate
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(target)
+    scored = []
+    for position in candidates:
+        matcher.set_seq1(titles[position])
+        scored.append((matcher.ratio(), titles[position]))
+    scored.sort(reverse=True)
+    cutoff = scored[MATCH_NB_CLOSEST - 1][0] if len(scored) >= MATCH_NB_CLOSEST else 0.0
+    cutoff = max([cutoff] + [score for score, title in scored if plausible(title)][:1])
+
+    # Scoring, as difflib.get_close_matches(target, titles, n=10, cutoff=0.0), then year filter
+    for match in difflib.get_close_matches(target, titles, n=MATCH_NB_CLOSEST, cutoff=cutoff):
+        match_year = plausible(match)
+        if match_year:
+            return match_year[0]['ac_id'], difflib.SequenceMatcher(None, match, target).ratio()
+    return None, 0.0
+
+def find_closest_id(target: str, title_index: dict, year: str = None) -> str | None:
     """Finds closest movie to target, based on movie title, and filtered on movie year
     
     """
-    possible_years = [str(int(year) + offset) for offset in range(-5, 6)]
-    candidates = list(title_to_id_year.keys())
-    matches = difflib.get_close_matches(target, candidates, n=10, cutoff=0.0)
-    match_year = None
-    if matches:
-        if year:
-            match_year = [elem for sublist in [title_to_id_year[match] for match in matches] for elem in sublist if elem['ac_year'] in possible_years]
-        else:
-            match_year = title_to_id_year[matches[0]]
-    match_id = match_year[0]['ac_id'] if match_year else None
-    return match_id 
+    match_id, _ = find_closest_match(target, title_index, year)
+    return match_id
 
 def google_maps_link(address: str) -> str:
     """Transforms an address to its Google Maps URL
@@ -60,6 +171,25 @@ def google_maps_link(address: str) -> str:
     query = urllib.parse.quote(address)
     return f"https://www.google.com/maps/search/?api=1&query={query}"
 
+def load_json(path: str, default=None):
+    """Reads a JSON file, default if it does not exist yet
+    
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def dump_json(data, path: str, indent: int = 2):
+    """Writes data to a JSON file atomically, a crash never leaves a partial file
+    
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
 def safe_get(url, session, timeout=15):
     """Wrapper autour de session.get avec try/except.
        Retourne None si erreur critique.